@@ -0,0 +1,342 @@
+import copy
+import gc
+import json
+import random
+import sys
+import tempfile
+import timeit
+import tracemalloc
+import uuid
+from pathlib import Path
+import mmh3
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+import REMSG
+import REMSGUtil
+import REWString
+
+
+def wcharPool2StrDictPerChar(wcharPool: bytes) -> dict[int, str]:
+    """the previous per-char implementation of REWString.wcharPool2StrDict, as the baseline.
+    (it count offsets in chars, so only correct for pools without surrogate pairs)"""
+    if len(wcharPool) == 0:
+        return dict()
+
+    stringPool = REWString.wcharPool2StrPool(wcharPool)
+
+    stringDict: dict[int, str] = dict()
+    start_pointer = 0
+    for i, wchar in enumerate(stringPool):
+        if wchar == "\x00":
+            stringDict[start_pointer * 2] = stringPool[start_pointer:i]  # local offset : value without \x00
+            start_pointer = i + 1  # update sp
+    return stringDict
+
+
+def buildWcharPool(stringCount: int, maxLength: int = 80, seed: int = 0, chars: str = "abcdefg 0123<>/\r\nあいうえお魔改繁體中文") -> bytes:
+    """random wcharPool, similar to a msg file with stringCount strings"""
+    rand = random.Random(seed)
+    strings = sorted(set("".join(rand.choice(chars) for _ in range(rand.randint(0, maxLength))) for _ in range(stringCount)))
+    return b"".join(REWString.toWcharBytes(x) for x in strings)
+
+
+def buildMSG(entryCount: int, version: int = 23, seed: int = 0) -> REMSG.MSG:
+    """random MSG object with entryCount entries, an int and a string attribute"""
+    rand = random.Random(seed)
+    msg = REMSG.MSG()
+    msg.version = version
+    msg.languages = list(range(REMSG.VERSION_2_LANG_COUNT[version]))
+    msg.attributeHeaders = list([{"valueType": 0, "name": "Id"}, {"valueType": 2, "name": "Tag"}])
+    msg.entrys = list()
+    for i in range(entryCount):
+        name = f"Entry_{i:06}"
+        entry = REMSG.Entry(version)
+        entry.buildEntry(
+            guid=f"{rand.getrandbits(128):032x}",
+            crc=0,
+            name=name,
+            attributeValues=[i, f"tag{i % 7}"],
+            langs=list([f"{name} text {lang}" if lang % 4 else "" for lang in msg.languages]),
+            hash=mmh3.hash(key=name.encode("utf-16-le"), seed=0xFFFFFFFF, signed=False),
+            index=i,
+        )
+        msg.entrys.append(entry)
+    return msg
+
+
+class DictEntry:
+    """the previous Entry without __slots__, which also kept the offsets of its head after reading, as the baseline"""
+
+    def __init__(self, version):
+        self.version = version
+
+    def readHead(self, table: REMSG.EntryTable, index: int):
+        self.guid = uuid.UUID(bytes_le=table.guids[index])
+        self.crc = table.crcs[index]
+        if REMSG.isVersionEntryByHash(self.version):
+            self.hash = table.hashOrIndexes[index]
+        else:
+            self.index = table.hashOrIndexes[index]
+        self.entryNameOffset: int = table.entryNameOffsets[index]
+        self.attributeOffset: int = table.attributeOffsets[index]
+        self.contentOffsetsByLangs: list[int] = list([offsets[index] for offsets in table.contentOffsetsByLangs])
+
+
+def timeIt(func, *args, repeat: int = 5) -> float:
+    """best time of repeat runs, in ms"""
+    return min(timeit.repeat(lambda: func(*args), number=1, repeat=repeat)) * 1000
+
+
+def BenchWcharPool2StrDict():
+    print("wcharPool2StrDict (ms):")
+    for stringCount in (1_000, 30_000, 300_000):
+        wcharPool = buildWcharPool(stringCount)
+        assert REWString.wcharPool2StrDict(wcharPool) == wcharPool2StrDictPerChar(wcharPool), "wcharPool2StrDict mismatch"
+        baseline = timeIt(wcharPool2StrDictPerChar, wcharPool)
+        current = timeIt(REWString.wcharPool2StrDict, wcharPool)
+        print(f"  {stringCount:>7} strings, {len(wcharPool) / 1024 / 1024:6.2f} MiB: per char {baseline:8.2f}, split {current:8.2f}, x{baseline / current:.1f}")
+
+
+def readAttributesPerValue(buffer: bytes, offset: int, attributeHeaders: list[dict], entryCount: int) -> list[list]:
+    """the previous match per attribute implementation of reading attributes, as the baseline"""
+    result = list()
+    for _ in range(entryCount):
+        attributes = list()
+        for header in attributeHeaders:
+            match header["valueType"]:
+                case -1 | 2:
+                    (value,) = REMSG.UINT64.unpack_from(buffer, offset)
+                case 0:
+                    (value,) = REMSG.INT64.unpack_from(buffer, offset)
+                case 1:
+                    (value,) = REMSG.DOUBLE.unpack_from(buffer, offset)
+            attributes.append(value)
+            offset += 8
+        result.append(attributes)
+    return result
+
+
+def BenchAttributes():
+    print("read attributes (ms):")
+    attributeHeaders = list([{"valueType": valueType, "name": f"attr{i}"} for i, valueType in enumerate([0, 1, 2, -1, 0, 2, 1, 0, 2, 0])])
+    codec = REMSG.getAttributeCodecByHeaders(attributeHeaders)
+    for entryCount in (1_000, 100_000):
+        rand = random.Random(0)
+        buffer = bytes(rand.getrandbits(8) for _ in range(8)) * (len(attributeHeaders) * entryCount)
+        assert codec.unpackAll(memoryview(buffer), 0, entryCount) == readAttributesPerValue(buffer, 0, attributeHeaders, entryCount), "attribute codec mismatch"
+        baseline = timeIt(readAttributesPerValue, buffer, 0, attributeHeaders, entryCount)
+        current = timeIt(codec.unpackAll, memoryview(buffer), 0, entryCount)
+        print(f"  {entryCount:>7} entries x {len(attributeHeaders)} attributes: per value {baseline:8.2f}, codec {current:8.2f}, x{baseline / current:.1f}")
+
+
+def entryMemory(entryClass, table: REMSG.EntryTable, decoded: list[REMSG.Entry]) -> float:
+    """bytes allocated per entry to read the heads of table into entryClass, strings are shared with decoded"""
+    gc.collect()
+    tracemalloc.start()
+    entrys = list()
+    for i, src in enumerate(decoded):
+        entry = entryClass(src.version)
+        entry.readHead(table, i)
+        entry.name = src.name
+        entry.attributes = list(src.attributes)
+        entry.langs = list(src.langs)
+        entrys.append(entry)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / len(entrys)
+
+
+def BenchEntryMemory():
+    print("entry memory (bytes per entry, strings excluded):")
+    for entryCount in (1_000, 100_000):
+        buffer = buildMSG(entryCount).writeMSG()
+        decoded = REMSG.MSG()
+        decoded.readMSGFromBuffer(buffer)
+        table, _, _ = REMSG.MSG().readTables(buffer)
+        baseline = entryMemory(DictEntry, table, decoded.entrys)
+        current = entryMemory(REMSG.Entry, table, decoded.entrys)
+        print(f"  {entryCount:>7} entries: __dict__ {baseline:8.1f}, __slots__ {current:8.1f}, {(1 - current / baseline) * 100:.0f}% less")
+
+
+def BenchIncrementalWrite():
+    print("write after editing one string (ms):")
+    for entryCount in (1_000, 20_000):
+        msg = REMSG.MSG()
+        msg.readMSGFromBuffer(buildMSG(entryCount).writeMSG(), keepSourcePool=True)
+        msg.editEntry(0).langs[0] = "Modification 魔改"
+        REMSG.MSG().readMSGFromBuffer(msg.writeMSG(incremental=True))  # still a valid msg file
+        full = timeIt(msg.writeMSG)
+        incremental = timeIt(msg.writeMSG, True)
+        # edited through editEntry of an overlay, only that entry get packed again
+        overlay = REMSG.MSGOverlay(msg)
+        overlay.editEntry(1).langs[0] = "Modification 魔改"
+        REMSG.MSG().readMSGFromBuffer(overlay.writeMSG(incremental=True))
+        patched = timeIt(overlay.writeMSG, True)
+        print(f"  {entryCount:>7} entries: full {full:8.2f}, incremental {incremental:8.2f}, x{full / incremental:.1f}, overlay incremental {patched:8.2f}, x{full / patched:.1f}")
+
+
+def BenchImportCSV():
+    print("importCSV (ms), time per entry should stay flat:")
+    with tempfile.TemporaryDirectory() as folder:
+        for entryCount in (1_000, 5_000, 20_000):
+            msg = buildMSG(entryCount)
+            filename = str(Path(folder) / f"bench{entryCount}.msg.23.csv")
+            REMSGUtil.exportCSV(msg, filename)
+            current = timeIt(REMSGUtil.importCSV, msg, filename, repeat=3)
+            print(f"  {entryCount:>7} entries: {current:8.2f}, {current / entryCount * 1000:6.1f} us per entry")
+
+
+def tracedRun(func, *args) -> tuple[float, float]:
+    """(ms, KiB still allocated) of one run, the result is kept alive while measuring"""
+    gc.collect()
+    tracemalloc.start()
+    start = timeit.default_timer()
+    result = func(*args)
+    elapsed = (timeit.default_timer() - start) * 1000
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, current / 1024
+
+
+def BenchImportTXT():
+    print("importTXT with one line changed (ms / KiB):")
+    with tempfile.TemporaryDirectory() as folder:
+        for entryCount in (1_000, 20_000):
+            msg = buildMSG(entryCount)
+            filename = str(Path(folder) / f"bench{entryCount}.msg.23.txt")
+            REMSGUtil.exportTXT(msg, filename, 1)
+            lines = Path(filename).read_text(encoding="utf-8").splitlines(keepends=True)
+            lines[0] = "<string>Modification 魔改\n"
+            Path(filename).write_text("".join(lines), encoding="utf-8")
+            REMSGUtil.getEncoding(filename)  # warm up, so the encoding detector loading is not measured
+            deepcopyTime, deepcopySize = tracedRun(copy.deepcopy, msg)
+            importTime, importSize = tracedRun(REMSGUtil.importTXT, msg, filename, 1)
+            print(f"  {entryCount:>7} entries: deepcopy alone {deepcopyTime:8.2f} / {deepcopySize:9.1f}, importTXT {importTime:8.2f} / {importSize:9.1f}")
+
+
+def BenchDIScan():
+    print("Default Ignorable scan over all strings (ms):")
+    for entryCount in (1_000, 20_000):
+        texts = list(buildMSG(entryCount).iterStrings())
+        baseline = timeIt(lambda: [i for i, text in enumerate(texts) if any(REWString.isCharDI(char) for char in text)], repeat=3)
+        current = timeIt(REWString.scanDI, texts, repeat=3)
+        print(f"  {len(texts):>7} strings: per char {baseline:8.2f}, regex {current:8.2f}, x{baseline / current:.1f}")
+
+
+def exportJsonDump(msg: REMSG.MSG, filename: str):
+    """the previous exportJson, which built the whole json dict before writing, as the baseline"""
+    with open(filename, "w", encoding="utf-8") as jsonf:
+        json.dump(REMSGUtil.buildmhriceJson(msg), jsonf, ensure_ascii=False, indent=2)
+
+
+def tracedPeak(func, *args) -> tuple[float, float]:
+    """(ms, peak KiB allocated) of one run"""
+    gc.collect()
+    tracemalloc.start()
+    start = timeit.default_timer()
+    func(*args)
+    elapsed = (timeit.default_timer() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024
+
+
+def BenchExportJson():
+    print("exportJson (ms / peak KiB):")
+    with tempfile.TemporaryDirectory() as folder:
+        for entryCount in (1_000, 20_000):
+            msg = buildMSG(entryCount)
+            filename = str(Path(folder) / f"bench{entryCount}.msg.23.json")
+            REMSGUtil.printDIWarning(msg)  # scan once, so only the writing is measured
+            baselineTime, baselinePeak = tracedPeak(exportJsonDump, msg, filename)
+            baselineText = Path(filename).read_text(encoding="utf-8")
+            currentTime, currentPeak = tracedPeak(REMSGUtil.exportJson, msg, filename)
+            assert Path(filename).read_text(encoding="utf-8") == baselineText, "exportJson output mismatch"
+            print(f"  {entryCount:>7} entries: json.dump {baselineTime:8.2f} / {baselinePeak:9.1f}, streaming {currentTime:8.2f} / {currentPeak:9.1f}")
+
+
+def importJsonLoad(filename: str) -> REMSG.MSG:
+    """the previous importJson, which loaded the whole json before building entries, as the baseline"""
+    with open(filename, "r", encoding="utf-8") as jsonf:
+        mhriceJson = json.load(jsonf)
+    msg = REMSG.MSG()
+    REMSGUtil.readJsonHeader(msg, mhriceJson, mhriceJson["entries"][0] if len(mhriceJson["entries"]) > 0 else None)
+    msg.entrys = list([REMSGUtil.buildJsonEntry(msg, i, jEntry) for i, jEntry in enumerate(mhriceJson["entries"])])
+    return msg
+
+
+def importJsonIncremental(filename: str) -> REMSG.MSG:
+    """importJson without the DI scan"""
+    msg = REMSG.MSG()
+    msg.entrys = list(REMSGUtil.iterJsonEntries(msg, filename))
+    return msg
+
+
+def countJsonEntries(filename: str) -> int:
+    """a streaming consumer, which does not keep the entries"""
+    return sum(1 for _ in REMSGUtil.iterJsonEntries(REMSG.MSG(), filename))
+
+
+def BenchImportJson():
+    print("import json, DI scan excluded (ms / peak KiB):")
+    with tempfile.TemporaryDirectory() as folder:
+        for entryCount in (1_000, 20_000):
+            msg = buildMSG(entryCount)
+            filename = str(Path(folder) / f"bench{entryCount}.msg.23.json")
+            REMSGUtil.exportJson(msg, filename)
+            REMSGUtil.getEncoding(filename)  # warm up, so the encoding detector loading is not measured
+            baselineTime, baselinePeak = tracedPeak(importJsonLoad, filename)
+            currentTime, currentPeak = tracedPeak(importJsonIncremental, filename)
+            streamTime, streamPeak = tracedPeak(countJsonEntries, filename)
+            print(f"  {entryCount:>7} entries: json.load {baselineTime:8.2f} / {baselinePeak:9.1f}, incremental {currentTime:8.2f} / {currentPeak:9.1f}, streaming consumer {streamTime:8.2f} / {streamPeak:9.1f}")
+
+
+def BenchParseCache():
+    print("importMSG, parse vs parse cache (ms):")
+    with tempfile.TemporaryDirectory() as folder:
+        for entryCount in (1_000, 20_000):
+            filename = str(Path(folder) / f"bench{entryCount}.msg.23")
+            REMSGUtil.exportMSG(buildMSG(entryCount), filename)
+            cacheDir = str(Path(folder) / "cache")
+            REMSGUtil.importMSG(filename, cacheDir=cacheDir)
+            assert REMSGUtil.importMSG(filename, cacheDir=cacheDir).writeMSG() == REMSGUtil.importMSG(filename).writeMSG(), "parse cache mismatch"
+            baseline = timeIt(REMSGUtil.importMSG, filename, repeat=3)
+            current = timeIt(lambda: REMSGUtil.importMSG(filename, cacheDir=cacheDir), repeat=3)
+            print(f"  {entryCount:>7} entries: parse {baseline:8.2f}, cache {current:8.2f}, x{baseline / current:.1f}")
+
+
+def exportMHRTextDumpPerLang(msg: REMSG.MSG, filename: str):
+    """the previous exportMHRTextDump, one exportTXT (and DI scan) per language, as the baseline"""
+    for lang, outputPath in REMSGUtil.getMHRTextDumpFiles(filename).items():
+        if not Path(outputPath).parent.exists():
+            Path(outputPath).parent.mkdir(parents=True)
+        REMSGUtil.exportTXT(msg, outputPath, lang, "utf-8-sig")
+
+
+def BenchMHRTextDump():
+    print("exportMHRTextDump (ms):")
+    with tempfile.TemporaryDirectory() as folder:
+        for entryCount in (1_000, 20_000):
+            msg = buildMSG(entryCount)
+            baselineFile = str(Path(folder) / "baseline" / f"bench{entryCount}.msg.23.txt")
+            currentFile = str(Path(folder) / "current" / f"bench{entryCount}.msg.23.txt")
+            baseline = timeIt(exportMHRTextDumpPerLang, msg, baselineFile, repeat=3)
+            current = timeIt(REMSGUtil.exportMHRTextDump, msg, currentFile, repeat=3)
+            for lang, outputPath in REMSGUtil.getMHRTextDumpFiles(currentFile).items():
+                assert Path(outputPath).read_bytes() == Path(REMSGUtil.getMHRTextDumpFiles(baselineFile)[lang]).read_bytes(), "dump mismatch"
+            print(f"  {entryCount:>7} entries: per lang {baseline:8.2f}, one pass {current:8.2f}, x{baseline / current:.1f}")
+
+
+if __name__ == "__main__":
+    BenchWcharPool2StrDict()
+    BenchEntryMemory()
+    BenchAttributes()
+    BenchIncrementalWrite()
+    BenchImportCSV()
+    BenchImportTXT()
+    BenchDIScan()
+    BenchExportJson()
+    BenchImportJson()
+    BenchParseCache()
+    BenchMHRTextDump()
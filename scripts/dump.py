@@ -16,6 +16,7 @@ import json
 
 ENUM_FILE = R"..\MHWs-in-json\Enums_Internal.json"
 ENEMY_COUNT_FILE = R"..\MHWs-in-json\natives\STM\GameDesign\Common\Text\EnemyCountData.user.3.json"
+PARSE_CACHE_DIR = None  # e.g. R"G:\MHWs\msgcache", reuse parsed msg files between runs
 
 enum_data: dict = {}
 enemy_count_index: dict = {}
@@ -89,7 +90,7 @@ def worker(infile, outfile: str = None):
 
         print("processing:" + filenameFull)
 
-        msg = REMSGUtil.importMSG(filenameFull)
+        msg = REMSGUtil.importMSG(filenameFull, cacheDir=PARSE_CACHE_DIR)
         REMSGUtil.exportJson(msg, outfileFull)
 
     except Exception as e:
@@ -103,7 +104,7 @@ def dumpAlltxt(infile):
         filenameFull = os.path.abspath(infile)
         print("processing:" + filenameFull)
 
-        msg = REMSGUtil.importMSG(filenameFull)
+        msg = REMSGUtil.importMSG(filenameFull, cacheDir=PARSE_CACHE_DIR)
 
         REMSGUtil.exportMHRTextDump(msg, filenameFull + ".txt", False)
         REMSGUtil.exportCSV(msg, filenameFull + "." + "csv")
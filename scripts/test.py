@@ -1,17 +1,27 @@
 import argparse
+import concurrent.futures
+import json
 import logging
 import os
+import random
 import re
+import shutil
 import sys
+import tempfile
+import time
+import uuid
 from pathlib import Path
 import mmh3
 
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 import REMSGUtil
+import REWString
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
+import main as converter  # after basicConfig, main configures logging as well
+
 
 def DebugTest(msg, filenameFull):
     version = msg.version
@@ -45,7 +55,7 @@ def DebugTest(msg, filenameFull):
     # print("msg")
     # ht.printHexView(msg.writeMSG())
 
-    assert mmh3.hash(csvmsg.writeMSG()) == mmh3.hash(txtmsg.writeMSG()) == mmh3.hash(jsonmsg.writeMSG()) == mmh3.hash(msg.writeMSG()) == mmh3.hash(txtmsg2.writeMSG()), "import all format assert failed"
+    assert mmh3.hash(bytes(csvmsg.writeMSG())) == mmh3.hash(bytes(txtmsg.writeMSG())) == mmh3.hash(bytes(jsonmsg.writeMSG())) == mmh3.hash(bytes(msg.writeMSG())) == mmh3.hash(bytes(txtmsg2.writeMSG())), "import all format assert failed"
     # if not (mmh3.hash(csvmsg.writeMSG()) == mmh3.hash(txtmsg.writeMSG()) == mmh3.hash(jsonmsg.writeMSG()) == mmh3.hash(msg.writeMSG())):
     #     print(filenameFull,len(csvmsg.writeMSG()),len(txtmsg.writeMSG()),len(jsonmsg.writeMSG()),len(msg.writeMSG()) )
     #     # REMSGUtil.printHexView(csvmsg.writeMSG())
@@ -59,10 +69,12 @@ def DebugTest(msg, filenameFull):
     #     # REMSGUtil.exportMSG(jsonmsg, filenameFull+".json.new")
     #     # REMSGUtil.exportMSG(msg, filenameFull+".ori.new")
     if len(msg.entrys) > 1 and True:
-        csvmsg.entrys[0].langs[0] = "Modification 魔改"
-        txtmsg.entrys[0].langs[0] = "Modification 魔改"
-        txtmsg2.entrys[0].langs[0] = "Modification 魔改"
-        jsonmsg.entrys[0].langs[0] = "Modification 魔改"
+        original = msg.entrys[0].langs[0]
+        csvmsg.editEntry(0).langs[0] = "Modification 魔改"
+        txtmsg.editEntry(0).langs[0] = "Modification 魔改"
+        txtmsg2.editEntry(0).langs[0] = "Modification 魔改"
+        jsonmsg.editEntry(0).langs[0] = "Modification 魔改"
+        assert msg.entrys[0].langs[0] == original, "edit through import changed the base msg"
         REMSGUtil.exportCSV(csvmsg, filenameFull + ".mod.csv")
         REMSGUtil.exportTXT(txtmsg, filenameFull + ".mod.txt", 0)
         REMSGUtil.exportTXT(txtmsg2, filenameFull + "_name.mod.txt", 0)
@@ -72,14 +84,18 @@ def DebugTest(msg, filenameFull):
         mtxtmsg = REMSGUtil.importTXT(msg, filenameFull + ".mod.txt", 0)
         mtxtmsg2 = REMSGUtil.importTXT(msg, filenameFull + "_name.mod.txt", 0)
         mjsonmsg = REMSGUtil.importJson(msg, filenameFull + ".mod.json")
-        assert mmh3.hash(mcsvmsg.writeMSG()) == mmh3.hash(mtxtmsg.writeMSG()) == mmh3.hash(mjsonmsg.writeMSG()) == mmh3.hash(mtxtmsg2.writeMSG())
+        assert mmh3.hash(bytes(mcsvmsg.writeMSG())) == mmh3.hash(bytes(mtxtmsg.writeMSG())) == mmh3.hash(bytes(mjsonmsg.writeMSG())) == mmh3.hash(bytes(mtxtmsg2.writeMSG()))
         REMSGUtil.exportMSG(mtxtmsg, filenameFull + ".mod.new")
 
         modmsg = REMSGUtil.importMSG(filenameFull + ".mod.new")
         modmsg.entrys[0].langs[0] = msg.entrys[0].langs[0]
         REMSGUtil.exportMSG(modmsg, filenameFull + ".new")
         newmsg = REMSGUtil.importMSG(filenameFull + ".new")
-        assert mmh3.hash(msg.writeMSG()) == mmh3.hash(newmsg.writeMSG())
+        assert mmh3.hash(bytes(msg.writeMSG())) == mmh3.hash(bytes(newmsg.writeMSG()))
+
+    for entry in msg.entrys[:16]:
+        assert REMSGUtil.lookup(filenameFull, entry.name, 0) == entry.langs[0], f"lookup by name failed {entry.name}"
+        assert REMSGUtil.lookup(filenameFull, entry.guid, 0) == next(e for e in msg.entrys if e.guid == entry.guid).langs[0], f"lookup by guid failed {entry.guid}"
 
     allAttr = REMSGUtil.searchAllAttr(msg, filenameFull)
     entryNameToSearch = "ep_qn"
@@ -105,6 +121,341 @@ def DebugTest(msg, filenameFull):
         print(line)
 
 
+def buildTestMSG(version: int, rand: random.Random) -> REMSGUtil.REMSG.MSG:
+    """small MSG object of version with random strings, a string attribute first"""
+    chars = "abc 012\r\n魔改繁體\U0001F600"
+    msg = REMSGUtil.REMSG.MSG()
+    msg.version = version
+    msg.languages = list(range(REMSGUtil.REMSG.VERSION_2_LANG_COUNT[version]))
+    msg.attributeHeaders = list([{"valueType": 2, "name": "Tag"}])
+    msg.entrys = list()
+    for i in range(rand.randint(1, 8)):
+        name = f"Entry_{i}"
+        entry = REMSGUtil.REMSG.Entry(version)
+        entry.buildEntry(
+            guid=f"{rand.getrandbits(128):032x}",
+            crc=0,
+            name=name,
+            attributeValues=["".join(rand.choice(chars) for _ in range(rand.randint(0, 8)))],
+            langs=list(["".join(rand.choice(chars) for _ in range(rand.randint(0, 40))) for _ in msg.languages]),
+            hash=REMSGUtil.REMSG.hashName(name),
+            index=i,
+        )
+        msg.entrys.append(entry)
+    return msg
+
+
+def CipherTest():
+    """block cipher should give byte-identical result as the reference one"""
+    rand = random.Random(0)
+    for size in (0, 2, 16, 18, REWString.BLOCK_SIZE, REWString.BLOCK_SIZE + 2, REWString.BLOCK_SIZE * 3 + 34):
+        size = size + rand.randrange(0, 8, 2) if size > 16 else size
+        plain = rand.randbytes(size)
+        cipher = REWString.encrypt(plain)
+        assert REWString.blockEncrypt(plain) == cipher, f"blockEncrypt mismatch, size {size}"
+        assert REWString.blockDecrypt(cipher) == plain, f"blockDecrypt mismatch, size {size}"
+        assert REWString.decrypt(cipher) == plain, f"decrypt mismatch, size {size}"
+        start = rand.randrange(0, size + 1)
+        end = rand.randrange(start, size + 1)
+        assert REWString.blockDecrypt(cipher, start, end) == plain[start:end], f"blockDecrypt range mismatch, size {size}, range {start}-{end}"
+
+    # string pools written by writeMSG, then with a string appended to the cipher chain by an incremental write
+    for version in REMSGUtil.REMSG.VERSION_2_LANG_COUNT.keys():
+        if not REMSGUtil.REMSG.isVersionEncrypt(version):
+            continue
+        msg = buildTestMSG(version, rand)
+        for incremental in (False, True):
+            buffer = msg.writeMSG(incremental)
+            _, _, dataOffset = REMSGUtil.REMSG.MSG().readTables(buffer)
+            cipher = bytes(buffer[dataOffset:])
+            plain = REWString.decrypt(cipher)
+            poolStrings = set(REWString.wcharPool2StrDict(plain).values())
+            # an incremental write keeps the replaced strings in the pool
+            assert poolStrings >= set(msg.iterStrings()) and (incremental or poolStrings == set(msg.iterStrings())), f"writeMSG pool is not the reference cipher, version {version}, incremental {incremental}"
+            assert REWString.encrypt(plain) == cipher, f"encrypt mismatch, version {version}, incremental {incremental}"
+            assert REWString.blockEncrypt(plain) == cipher, f"blockEncrypt mismatch, version {version}, incremental {incremental}"
+            assert REWString.blockDecrypt(cipher) == plain, f"blockDecrypt mismatch, version {version}, incremental {incremental}"
+            source = REMSGUtil.REMSG.MSG()
+            source.readMSGFromBuffer(buffer, keepSourcePool=True)
+            msg = REMSGUtil.REMSG.MSGOverlay(source)
+            msg.editEntry(0).langs[0] = f"appended {version} 魔改"
+
+
+def IncrementalWriteTest():
+    """incremental write should give the source bytes back when nothing is edited, and keep every edit however it is made"""
+    REMSG = REMSGUtil.REMSG
+    text = "edited 魔改"
+
+    def editOverlay(msg):
+        overlay = REMSG.MSGOverlay(msg)
+        overlay.editEntry(0).langs[0] = text
+        return overlay
+
+    def editBaseLangs(msg):
+        msg.entrys[-1].langs[-1] = text  # in place, not through editEntry
+        return REMSG.MSGOverlay(msg)
+
+    def editBaseAttributes(msg):
+        msg.entrys[0].attributes[0] = text
+        return REMSG.MSGOverlay(msg)
+
+    def editBaseName(msg):
+        entry = msg.entrys[0]
+        entry.name = text
+        if REMSG.isVersionEntryByHash(entry.version):
+            entry.hash = REMSG.hashName(text)
+        return REMSG.MSGOverlay(msg)
+
+    def editPlain(msg):
+        msg.entrys[0].langs.append("extra")
+        msg.entrys[0].langs.pop(0)
+        msg.entrys[-1].crc = 1234
+        return msg
+
+    def dump(msg):
+        return list([(entry.rawGuid, entry.crc, entry.name, list(entry.attributes), list(entry.langs)) for entry in msg.entrys])
+
+    rand = random.Random(0)
+    for version in REMSG.VERSION_2_LANG_COUNT.keys():
+        source = bytes(buildTestMSG(version, rand).writeMSG())
+        for lazy in (False, True):
+            msg = REMSG.MSG()
+            msg.readMSGFromBuffer(source, lazy=lazy, keepSourcePool=True)
+            assert bytes(msg.writeMSG(incremental=True)) == source, f"unmodified msg changed, version {version}, lazy {lazy}"
+            assert bytes(REMSG.MSGOverlay(msg).writeMSG(incremental=True)) == source, f"unmodified overlay changed, version {version}, lazy {lazy}"
+            for edit in (editOverlay, editBaseLangs, editBaseAttributes, editBaseName, editPlain):
+                msg = REMSG.MSG()
+                msg.readMSGFromBuffer(source, lazy=lazy, keepSourcePool=True)
+                edited = edit(msg)
+                result = REMSG.MSG()
+                result.readMSGFromBuffer(edited.writeMSG(incremental=True))
+                assert dump(result) == dump(edited), f"{edit.__name__} lost, version {version}, lazy {lazy}"
+
+
+def GuidTest():
+    rand = random.Random(0)
+    for _ in range(1000):
+        guid = uuid.UUID(int=rand.getrandbits(128))
+        assert REMSGUtil.REMSG.guidToStr(guid.bytes_le) == str(guid), f"guidToStr mismatch {guid}"
+        for text in (str(guid), guid.hex, str(guid).upper(), "{" + str(guid) + "}", guid.urn):
+            assert REMSGUtil.REMSG.strToGuid(text) == guid.bytes_le, f"strToGuid mismatch {text}"
+
+
+def StringPoolTest():
+    """offsets of stringDict should be in bytes, even with surrogate pairs"""
+    strings = ["", "abc", "魔改", "\U0001F600", "a\U0001F600b\U00020000c", "\r\n", "longer than a chunk " * 20, "end"]
+    wcharPool = b"".join(REWString.toWcharBytes(x) for x in strings)
+    offsetDict = REWString.calcStrPoolOffsets(strings)
+    assert b"".join(REWString.toWcharBytes(x) for x in offsetDict.keys()) == b"".join(REWString.toWcharBytes(x) for x in sorted(strings)), "calcStrPoolOffsets order changed"
+    stringDict = REWString.wcharPool2StrDict(b"".join(REWString.toWcharBytes(x) for x in offsetDict.keys()))
+    assert stringDict == {v: k for k, v in offsetDict.items()}, "wcharPool2StrDict offsets mismatch calcStrPoolOffsets"
+    pool = REWString.StringPool(wcharPool)
+    chunkedPool = REWString.ChunkedStringPool(memoryview(wcharPool))
+    for offset, string in REWString.wcharPool2StrDict(wcharPool).items():
+        assert wcharPool[offset:].decode("utf-16-le").startswith(string + "\x00"), f"wrong offset {offset} for {string}"
+        assert pool.seek(offset) == string, f"StringPool mismatch at {offset}"
+        assert chunkedPool.seek(offset) == string, f"ChunkedStringPool mismatch at {offset}"
+
+
+class SplitStream:
+    """text stream which returns the text in two reads, split at splitAt"""
+
+    def __init__(self, text: str, splitAt: int):
+        self.parts = list([part for part in (text[:splitAt], text[splitAt:]) if len(part) > 0])
+
+    def read(self, size: int = -1) -> str:
+        return self.parts.pop(0) if len(self.parts) > 0 else ""
+
+
+def JsonStreamTest():
+    """incremental json reader should read the same values wherever the chunk ends, numbers included,
+    and streamed json writer should write the same bytes as json.dump"""
+    for text in (
+        '{"a": 12.25, "entries": [1.5e10, -3E+5, 0, 7, true, null, "x,]"], "b": [-0.125e-3]}',
+        '{"entries": [], "version": 23}',
+        '{"a": 12}',
+    ):
+        expected = json.loads(text)
+        expected.setdefault("entries", list())  # an empty array yields no item
+        for splitAt in range(len(text) + 1):
+            items = dict()
+            for key, value in REMSGUtil.iterJsonItems(SplitStream(text, splitAt), "entries"):
+                if key == "entries":
+                    items.setdefault(key, list()).append(value)
+                else:
+                    items[key] = value
+            items.setdefault("entries", list())
+            assert items == expected, f"iterJsonItems mismatch when split at {splitAt}: {text[:splitAt]!r}"
+
+    # streamed json output should be byte identical to json.dump of the whole json dict
+    rand = random.Random(0)
+    msgs = list([buildTestMSG(version, rand) for version in REMSGUtil.REMSG.VERSION_2_LANG_COUNT.keys()])
+    msg = buildTestMSG(23, rand)
+    msg.attributeHeaders = list([{"valueType": -1, "name": ""}, {"valueType": 0, "name": "Int"}, {"valueType": 1, "name": "Float"}, {"valueType": 2, "name": 'Quote"\\'}])
+    for entry in msg.entrys:
+        entry.attributes = list(["", rand.randint(-(1 << 63), (1 << 63) - 1), rand.uniform(-1e10, 1e10), '"\\\t\u0001'])
+    msgs.append(msg)
+    msg = buildTestMSG(23, rand)
+    msg.entrys = list()
+    msgs.append(msg)
+    with tempfile.TemporaryDirectory() as folder:
+        for msg in msgs:
+            expected = json.dumps(REMSGUtil.buildmhriceJson(msg), ensure_ascii=False, indent=2)
+            assert "".join(REMSGUtil.iterMhriceJson(msg)) == expected, f"iterMhriceJson mismatch, version {msg.version}, {len(msg.entrys)} entries"
+            filename = os.path.join(folder, f"test.msg.{msg.version}.json")
+            REMSGUtil.exportJson(msg, filename, list())
+            with open(os.path.join(folder, "expected.json"), "w", encoding="utf-8") as jsonf:
+                json.dump(REMSGUtil.buildmhriceJson(msg), jsonf, ensure_ascii=False, indent=2)
+            with open(filename, "rb") as jsonf, open(os.path.join(folder, "expected.json"), "rb") as expectedf:
+                assert jsonf.read() == expectedf.read(), f"exportJson mismatch, version {msg.version}, {len(msg.entrys)} entries"
+
+
+def ParseCacheTest():
+    """a msg loaded from the parse cache should be the same as the msg read from the file"""
+
+    def dump(msg):
+        byHash = REMSGUtil.REMSG.isVersionEntryByHash(msg.version)
+        entrys = list([(entry.rawGuid, entry.crc, entry.hash if byHash else entry.index, entry.name, list(entry.attributes), list(entry.langs)) for entry in msg.entrys])
+        return (msg.version, list(msg.languages), list(msg.attributeHeaders), entrys)
+
+    rand = random.Random(0)
+    with tempfile.TemporaryDirectory() as folder:
+        cacheDir = os.path.join(folder, "cache")
+        for version in REMSGUtil.REMSG.VERSION_2_LANG_COUNT.keys():
+            filename = os.path.join(folder, f"test.msg.{version}")
+            REMSGUtil.exportMSG(buildTestMSG(version, rand), filename)
+            assert REMSGUtil.loadParseCache(cacheDir, filename) is None, f"stale parse cache hit, version {version}"
+            fresh = REMSGUtil.importMSG(filename, cacheDir=cacheDir)
+            assert REMSGUtil.loadParseCache(cacheDir, filename) is not None, f"parse cache not written, version {version}"
+            cached = REMSGUtil.importMSG(filename, cacheDir=cacheDir)
+            assert dump(cached) == dump(fresh) == dump(REMSGUtil.importMSG(filename)), f"parse cache mismatch, version {version}"
+
+
+def MultiModeTest():
+    """outputs of one run with several modes should be byte identical to the outputs of each mode run alone"""
+    rand = random.Random(0)
+    with tempfile.TemporaryDirectory() as folder:
+        for version, langCount in REMSGUtil.REMSG.VERSION_2_LANG_COUNT.items():
+            if max(REMSGUtil.REMSG.MHR_SUPPORTED_LANG) >= langCount:
+                continue  # dump is for mhr msg files only
+            source = bytes(buildTestMSG(version, rand).writeMSG())
+            # txt and dump only are read lazily, the others fully, with one DI scan for all the modes
+            for mode in ("csv,json,txt,dump", "txt,dump"):
+                for entryName in (False, True):
+                    options = dict(lang=1, txtformat=None, entryName=entryName)
+                    modeFolder = Path(folder) / f"{version}_{entryName}"
+                    for outMode in [mode] + mode.split(","):
+                        (modeFolder / outMode).mkdir(parents=True)
+                        (modeFolder / outMode / f"test.msg.{version}").write_bytes(source)
+                        result = converter.worker(modeFolder / outMode / f"test.msg.{version}", mode=outMode, **options)
+                        assert result.status == "ok", f"{outMode} failed, version {version}: {result.error}"
+                    for outMode in mode.split(","):
+                        outputs = converter.getOutputFiles(modeFolder / outMode / f"test.msg.{version}", outMode, None)
+                        assert len(outputs) > 0
+                        for output in outputs:
+                            multiOutput = Path(mode).joinpath(Path(output).relative_to(modeFolder / outMode))
+                            assert (modeFolder / multiOutput).read_bytes() == Path(output).read_bytes(), f"{multiOutput} differs from -m {outMode}, version {version}, entryName {entryName}"
+                    shutil.rmtree(modeFolder)
+
+
+class InlineExecutor(concurrent.futures.Executor):
+    """run each task when it is submitted, in this thread"""
+
+    def submit(self, fn, /, *args, **kwargs) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class CountingExecutor(concurrent.futures.ThreadPoolExecutor):
+    """thread pool which keeps the most tasks submitted but not done at once"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.futures = list()
+        self.maxInFlight = 0
+
+    def submit(self, fn, /, *args, **kwargs) -> concurrent.futures.Future:
+        future = super().submit(fn, *args, **kwargs)
+        self.futures.append(future)
+        self.maxInFlight = max(self.maxInFlight, sum(1 for x in self.futures if not x.done()))
+        return future
+
+
+def slowBatchWorker(batch, records=None, **kwargs):
+    """batchWorker which takes some time and converts nothing"""
+    time.sleep(0.01)
+    return list([converter.FileResult(file, "ok", 0.0) for file, _ in batch])
+
+
+def dyingBatchWorker(batch, records=None, **kwargs):
+    """batchWorker whose process dies on a file named die"""
+    if any(file.name == "die" for file, _ in batch):
+        os._exit(1)
+    return list([converter.FileResult(file, "ok", 0.0) for file, _ in batch])
+
+
+def BatchTest():
+    """files should be batched largest first within the caps, and every file should get exactly one result"""
+    with tempfile.TemporaryDirectory() as folder:
+        sizes = [converter.BATCH_BYTES * 3 // 2, converter.BATCH_BYTES, converter.BATCH_BYTES // 3, converter.BATCH_BYTES // 4] + [100 + i for i in range(150)]
+        random.Random(0).shuffle(sizes)
+        filenameList = list()
+        editList = list()
+        for i, size in enumerate(sizes):
+            filename = Path(folder) / f"f{i}.msg.23"
+            with open(filename, "wb") as f:
+                f.truncate(size)
+            filenameList.append(filename)
+            edit = None
+            if i % 10 == 0:
+                edit = Path(folder) / f"f{i}.msg.23.txt"
+                edit.write_bytes(b"edit")
+            editList.append(edit)
+
+        def pairSize(pair):
+            return sum(file.stat().st_size for file in pair if file is not None)
+
+        batches = converter.makeBatches(filenameList, editList)
+        pairs = list([pair for batch in batches for pair in batch])
+        assert sorted(pairs, key=str) == sorted(zip(filenameList, editList), key=str), "makeBatches lost or duplicated files"
+        pairSizes = list(map(pairSize, pairs))
+        assert pairSizes == sorted(pairSizes, reverse=True), "makeBatches is not largest first"
+        for batch in batches:
+            batchSizes = list(map(pairSize, batch))
+            assert len(batch) <= converter.BATCH_FILES, f"batch of {len(batch)} files"
+            assert len(batch) == 1 or sum(batchSizes[:-1]) < converter.BATCH_BYTES and max(batchSizes) < converter.BATCH_BYTES, f"batch of {sum(batchSizes)} bytes"
+
+        # each file gets a result, broken files as errors
+        errorBatches = batches[:3]
+        results = converter.runBatches(InlineExecutor(), errorBatches, 2, mode="csv")
+        assert sorted(result.file for result in results) == sorted(file for batch in errorBatches for file, _ in batch), "runBatches lost or duplicated files"
+        assert all(result.status == "error" for result in results), "files which are not msg files converted"
+
+        originalBatchWorker = converter.batchWorker
+        try:
+            # at most maxInFlight tasks are submitted but not done
+            converter.batchWorker = slowBatchWorker
+            for maxInFlight in (1, 3):
+                with CountingExecutor(8) as executor:
+                    results = converter.runBatches(executor, batches, maxInFlight)
+                assert 0 < executor.maxInFlight <= maxInFlight, f"{executor.maxInFlight} tasks in flight, expected {maxInFlight}"
+                assert sorted(result.file for result in results) == sorted(filenameList), "runBatches lost or duplicated files"
+
+            # a dead process breaks the pool, its files and the ones not submitted yet are errors
+            converter.batchWorker = dyingBatchWorker
+            die = Path(folder) / "die"
+            batches = list([[(Path(folder) / "first", None)], [(die, None)], [(Path(folder) / "after", None)], [(Path(folder) / "last", None)]])
+            with concurrent.futures.ProcessPoolExecutor(1) as executor:
+                results = converter.runBatches(executor, batches, 1)
+            assert list([(result.file.name, result.status) for result in results]) == [("first", "ok"), ("die", "error"), ("after", "error"), ("last", "error")], f"unexpected results {results}"
+        finally:
+            converter.batchWorker = originalBatchWorker
+
+
 errorList = []
 
 
@@ -130,6 +481,15 @@ if __name__ == "__main__":
 
     multiprocessing.freeze_support()
 
+    CipherTest()
+    IncrementalWriteTest()
+    GuidTest()
+    StringPoolTest()
+    JsonStreamTest()
+    ParseCacheTest()
+    MultiModeTest()
+    BatchTest()
+
     # infolder = R".\REMSG_Converter_1.2.0\test\RE3_PS4_1.07"
 
     # filenameList = [os.path.join(dp, f) for dp, dn, filenames in os.walk(infolder) for f in filenames if f.endswith(".msg.67109135")]
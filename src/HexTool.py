@@ -10,6 +10,13 @@ def pad_align_up(filestream: io.BufferedReader, align: int) -> int | None:
     return padding
 
 
+def pad_align_up_buffer(buffer: bytes | memoryview, offset: int, align: int) -> int:
+    """pad to align when reading from a buffer, return the aligned offset"""
+    padSize = (align - offset % align) % align
+    assert not any(buffer[offset : offset + padSize]), "padding value should be zero"
+    return offset + padSize
+
+
 def printHexView(bytestream: bytearray | bytes, width=32):
     """print hex bytes similar in hex editor, for debug usage"""
     view = ""
@@ -1,12 +1,18 @@
+import functools
 import io
+import itertools
+import mmap
 import struct
+import sys
 import uuid
 from typing import Final
 import logging
+from array import array
+from collections.abc import Iterator, MutableSequence, Sequence
 
 import mmh3
 import REWString as helper
-from HexTool import pad_align_up
+from HexTool import pad_align_up_buffer
 
 LANG_LIST: Final[dict[int, str]] = {
     0: "Japanese",
@@ -137,84 +143,236 @@ def isVersionIgnoreUnusedLang(version: int) -> bool:
     return version >= 23 and version != 0x2022_033D and version != 0x0100_010C and version != 0x0300_010E and version != 0x0400_010F
 
 
+VALIDATION_NONE: Final[str] = "none"
+"""trust the file, skip all checks"""
+VALIDATION_STRUCTURAL: Final[str] = "structural"
+"""check offsets / paddings of each section, skip the hash / index check of each entry"""
+VALIDATION_FULL: Final[str] = "full"
+"""check everything, include the hash(by name) / index of each entry"""
+VALIDATION_LEVELS: Final[tuple[str, ...]] = (VALIDATION_NONE, VALIDATION_STRUCTURAL, VALIDATION_FULL)
+
+
+@functools.lru_cache(maxsize=1 << 20)
+def hashName(name: str) -> int:
+    """hash of entry name, memoized as the same names get hashed again on read, import and write"""
+    return mmh3.hash(key=name.encode("utf-16-le"), seed=0xFFFFFFFF, signed=False)
+
+
+INT64: Final[struct.Struct] = struct.Struct("<q")
+UINT64: Final[struct.Struct] = struct.Struct("<Q")
+DOUBLE: Final[struct.Struct] = struct.Struct("<d")
+
+HEADER_STRUCT: Final[struct.Struct] = struct.Struct("<I4sQIII")
+"""version, magic, headerOffset, entryCount, attributeCount, langCount"""
+SECTION_OFFSETS_STRUCT: Final[struct.Struct] = struct.Struct("<4Q")
+"""unknDataOffset, langOffset, attributeOffset, attributeNameOffset"""
+SECTION_OFFSETS_STRUCT_ENCRYPT: Final[struct.Struct] = struct.Struct("<5Q")
+"""dataOffset, unknDataOffset, langOffset, attributeOffset, attributeNameOffset"""
+
+
+@functools.cache
+def getEntryHeadStruct(langCount: int) -> struct.Struct:
+    """guid, crc, hash or index, entryNameOffset, attributeOffset, contentOffsetsByLangs * langCount"""
+    return struct.Struct(f"<16sIIQQ{langCount}Q")
+
+
+@functools.cache
+def getArrayStruct(fmt: str, count: int) -> struct.Struct:
+    """struct for count * fmt, for those offset / index tables"""
+    return struct.Struct(f"<{count}{fmt}")
+
+
+ATTRIBUTE_FORMATS: Final[dict[int, str]] = {
+    -1: "Q",  # null wstring, offset to an empty string
+    0: "q",  # int64
+    1: "d",  # double
+    2: "Q",  # wstring, offset to the string
+}
+"""struct format of each attribute valueType"""
+
+
+class AttributeCodec:
+    """all entries of a msg share one attributeHeaders schema, so the attributes of an entry are packed / unpacked with one struct"""
+
+    __slots__ = ("valueTypes", "struct", "size", "nullIndexes", "wstringIndexes")
+
+    def __init__(self, valueTypes: tuple[int, ...]):
+        for valueType in valueTypes:
+            if valueType not in ATTRIBUTE_FORMATS:
+                raise NotImplementedError(f"{valueType} not implemented")
+        self.valueTypes = valueTypes
+        self.struct = struct.Struct("<" + "".join(ATTRIBUTE_FORMATS[valueType] for valueType in valueTypes))
+        self.size: int = self.struct.size
+        self.nullIndexes: tuple[int, ...] = tuple(i for i, valueType in enumerate(valueTypes) if valueType == -1)
+        self.wstringIndexes: tuple[int, ...] = tuple(i for i, valueType in enumerate(valueTypes) if valueType == 2)
+
+    def __reduce__(self):
+        # struct.Struct can not be pickled / deep copied, rebuild it (from cache) by the schema instead
+        return (getAttributeCodec, (self.valueTypes,))
+
+    def unpack(self, buffer: bytes | memoryview, offset: int) -> list:
+        """attributes of one entry, string attributes are left as file offsets"""
+        return list(self.struct.unpack_from(buffer, offset))
+
+    def unpackAll(self, buffer: bytes | memoryview, offset: int, entryCount: int) -> list[list]:
+        """attributes of entryCount entries stored one after another, in one pass"""
+        if self.size == 0:
+            return list([list() for _ in range(entryCount)])
+        # memoryview, so a bytes buffer is not copied and the slice can be released with the with block
+        with memoryview(buffer)[offset : offset + self.size * entryCount] as block:
+            return list([list(values) for values in self.struct.iter_unpack(block)])
+
+    def pack(self, buffer: bytearray, offset: int, attributes: list, strOffsetDict: dict[str, int]) -> int:
+        """fill the attributes of one entry into buffer at offset, return the offset after the attributes
+
+        @param strOffsetDict: file offset of each string in string pool
+        """
+        values = list(attributes)
+        for i in self.nullIndexes:
+            values[i] = strOffsetDict[""]
+        for i in self.wstringIndexes:
+            values[i] = strOffsetDict[values[i]]
+        self.struct.pack_into(buffer, offset, *values)
+        return offset + self.size
+
+
+@functools.cache
+def getAttributeCodec(valueTypes: tuple[int, ...]) -> AttributeCodec:
+    """codec of an attributeHeaders schema, see AttributeCodec"""
+    return AttributeCodec(valueTypes)
+
+
+def getAttributeCodecByHeaders(attributeHeaders: list[dict]) -> AttributeCodec:
+    """codec of attributeHeaders, see AttributeCodec"""
+    return getAttributeCodec(tuple([head["valueType"] for head in attributeHeaders]))
+
+
+def alignUp(offset: int, align: int) -> int:
+    """offset after padding to align"""
+    return offset + (align - offset % align) % align
+
+
+def calcLayout(version: int, entryCount: int, attributeCount: int, langCount: int) -> dict[str, int]:
+    """file offset of each section of a msg file, everything before the string pool has fixed size"""
+    layout = dict()
+    layout["sectionOffsetsOffset"] = alignUp(HEADER_STRUCT.size, 8)
+    sectionOffsetsStruct = SECTION_OFFSETS_STRUCT_ENCRYPT if isVersionEncrypt(version) else SECTION_OFFSETS_STRUCT
+    layout["entryOffsetsOffset"] = layout["sectionOffsetsOffset"] + sectionOffsetsStruct.size
+    layout["unknDataOffset"] = layout["entryOffsetsOffset"] + 8 * entryCount
+    layout["langOffset"] = layout["unknDataOffset"] + 8
+    layout["attributeOffset"] = alignUp(layout["langOffset"] + 4 * langCount, 8)
+    layout["attributeNameOffset"] = alignUp(layout["attributeOffset"] + 4 * attributeCount, 8)
+    layout["entryHeadsOffset"] = layout["attributeNameOffset"] + 8 * attributeCount
+    layout["attributesOffset"] = layout["entryHeadsOffset"] + getEntryHeadStruct(langCount).size * entryCount
+    layout["dataOffset"] = layout["attributesOffset"] + 8 * attributeCount * entryCount
+    return layout
+
+
+def guidToStr(rawGuid: bytes) -> str:
+    """format raw guid bytes (bytes_le) same as str(uuid.UUID(bytes_le=rawGuid))"""
+    h = rawGuid.hex()
+    return f"{h[6:8]}{h[4:6]}{h[2:4]}{h[0:2]}-{h[10:12]}{h[8:10]}-{h[14:16]}{h[12:14]}-{h[16:20]}-{h[20:]}"
+
+
+def strToGuid(guid: str) -> bytes:
+    """raw guid bytes (bytes_le) of a guid string, accept same formats as uuid.UUID(hex=guid)"""
+    raw = bytes.fromhex(guid.replace("urn:", "").replace("uuid:", "").strip("{}").replace("-", ""))
+    if len(raw) != 16:
+        raise ValueError("badly formed hexadecimal UUID string")
+    return raw[3::-1] + raw[5:3:-1] + raw[7:5:-1] + raw[8:]
+
+
+class TrackedList(list):
+    """list which remembers if it is modified, attributes / langs of entries read with keepSourcePool,
+    let writeMSG(incremental=True) skip the entries not edited"""
+
+    __slots__ = ("edited",)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.edited = False
+
+    def __setitem__(self, index, value):
+        self.edited = True
+        super().__setitem__(index, value)
+
+    def __delitem__(self, index):
+        self.edited = True
+        super().__delitem__(index)
+
+    def __iadd__(self, other):
+        self.edited = True
+        return super().__iadd__(other)
+
+    def __imul__(self, count):
+        self.edited = True
+        return super().__imul__(count)
+
+    def append(self, value):
+        self.edited = True
+        super().append(value)
+
+    def extend(self, values):
+        self.edited = True
+        super().extend(values)
+
+    def insert(self, index, value):
+        self.edited = True
+        super().insert(index, value)
+
+    def pop(self, index=-1):
+        self.edited = True
+        return super().pop(index)
+
+    def remove(self, value):
+        self.edited = True
+        super().remove(value)
+
+    def clear(self):
+        self.edited = True
+        super().clear()
+
+    def sort(self, *, key=None, reverse=False):
+        self.edited = True
+        super().sort(key=key, reverse=reverse)
+
+    def reverse(self):
+        self.edited = True
+        super().reverse()
+
+
 class Entry:
     """meat of MSG"""
 
+    # offsets of the entry head stay in the EntryTable, entry only keep the resolved values
+    __slots__ = ("version", "rawGuid", "crc", "hash", "index", "name", "attributes", "langs")
+
     def __init__(self, version):
         self.version = version
 
-    def readHead(self, filestream: io.BufferedReader, langCount: int):
-        """use when reading file only"""
+    def readHead(self, table: "EntryTable", index: int):
+        """use when reading file only, take the head of this entry from the columnar entry table"""
 
-        # we use bytes_le for guid(cuz c# use and store this way)
-        self.guid = uuid.UUID(
-            bytes_le=struct.unpack("<16s", filestream.read(16))[0],
-        )
-        (self.crc,) = struct.unpack("<I", filestream.read(4))
+        # we use bytes_le for guid(cuz c# use and store this way), keep it raw and format only when needed
+        self.rawGuid: bytes = table.guids[index]
+        self.crc = table.crcs[index]
         # actually I don't have a version 16 msg file so idk if 16 use hash or index
         if isVersionEntryByHash(self.version):
-            (self.hash,) = struct.unpack("<I", filestream.read(4))
-        else:
-            (self.index,) = struct.unpack("<I", filestream.read(4))
-
-        # offsets below should only be use when reading msg, and once you get the string they should not be use anymore
-        (self.entryNameOffset,) = struct.unpack("<Q", filestream.read(8))
-        (self.attributeOffset,) = struct.unpack("<Q", filestream.read(8))
-        self.contentOffsetsByLangs: list[int] = list()
-        for _ in range(langCount):
-            self.contentOffsetsByLangs.append(struct.unpack("<Q", filestream.read(8))[0])
-
-    def writeHead(self, bytestream: bytearray):
-        """extend the bytearray by filling entry head"""
-        bytestream.extend(struct.pack("<16s", self.guid.bytes_le))
-        bytestream.extend(struct.pack("<I", self.crc))
-        if isVersionEntryByHash(self.version):
-            bytestream.extend(struct.pack("<I", self.hash))
+            self.hash = table.hashOrIndexes[index]
         else:
-            bytestream.extend(struct.pack("<I", self.index))
-        self.entryNameOffsetPH = len(bytestream)
-        bytestream.extend(struct.pack("<q", -1))
-        self.attributeOffsetPH = len(bytestream)
-        bytestream.extend(struct.pack("<q", -1))
-        self.contentOffsetsByLangsPH: list[int] = list()
-        for _ in self.langs:
-            self.contentOffsetsByLangsPH.append(len(bytestream))
-            bytestream.extend(struct.pack("<q", -1))
-
-    def readAttributes(self, filestream: io.BufferedReader, attributeHeaders):
-        """read the attributes of this msg"""
-        self.attributes = list()
-        for header in attributeHeaders:
-            value = ""
-            match header["valueType"]:
-                case -1:  # null wstring
-                    (value,) = struct.unpack("<Q", filestream.read(8))
-                case 0:  # int64
-                    (value,) = struct.unpack("<q", filestream.read(8))
-                case 1:  # double
-                    (value,) = struct.unpack("<d", filestream.read(8))
-                case 2:  # wstring
-                    (value,) = struct.unpack("<Q", filestream.read(8))
-                case _:
-                    raise NotImplementedError(f"{value} not implemented")
-            self.attributes.append(value)
+            self.index = table.hashOrIndexes[index]
+
+    def readAttributes(self, buffer: bytes | memoryview, offset: int, codec: AttributeCodec) -> int:
+        """read the attributes of this msg, return the offset after the attributes"""
+        self.attributes = codec.unpack(buffer, offset)
+        return offset + codec.size
+
+    def writeAttributes(self, buffer: bytearray, offset: int, codec: AttributeCodec, strOffsetDict: dict[str, int]) -> int:
+        """fill the attributes into buffer at offset, return the offset after the attributes
 
-    def writeAttributes(self, bytestream: bytearray, attributeHeaders):
-        """extend and modify the bytearray by filling attributes"""
-        self.attributesPH = list()
-        for i, header in enumerate(attributeHeaders):
-            value = ""
-            match header["valueType"]:
-                case -1:  # null wstring
-                    value = struct.pack("<q", -1)
-                case 0:  # int64
-                    value = struct.pack("<q", self.attributes[i])
-                case 1:  # double
-                    value = struct.pack("<d", self.attributes[i])
-                case 2:  # wstring
-                    value = struct.pack("<q", -1)
-            self.attributesPH.append(len(bytestream))
-            bytestream.extend(value)
+        @param strOffsetDict: file offset of each string in string pool
+        """
+        return codec.pack(buffer, offset, self.attributes, strOffsetDict)
 
     def setName(self, name: str):
         """set entry name"""
@@ -224,9 +382,44 @@ class Entry:
         """set entry contents"""
         self.langs = langs
 
-    def buildEntry(self, guid: str, crc: int, name: str, attributeValues: list, langs: list[str], hash: int = 0, index: int = 0):
-        """use for file modification"""
-        self.guid = uuid.UUID(hex=guid)
+    def copy(self) -> "Entry":
+        """copy of this entry, with its own attributes / langs list to edit"""
+        entry = Entry(self.version)
+        entry.rawGuid = self.rawGuid
+        entry.crc = self.crc
+        if isVersionEntryByHash(self.version):
+            entry.hash = self.hash
+        else:
+            entry.index = self.index
+        entry.name = self.name
+        entry.attributes = list(self.attributes)
+        entry.langs = list(self.langs)
+        return entry
+
+    def isStringsEdited(self, name: str | None) -> bool:
+        """if name / attributes / langs may be changed since reading (read with keepSourcePool, see TrackedList)
+
+        @param name: the entry name string object as read.
+        """
+        attributes = self.attributes
+        langs = self.langs
+        return self.name is not name or type(attributes) is not TrackedList or attributes.edited or type(langs) is not TrackedList or langs.edited
+
+    @property
+    def guid(self) -> uuid.UUID:
+        """guid as uuid.UUID, prefer rawGuid / guidToStr when you only need to compare or print it"""
+        return uuid.UUID(bytes_le=self.rawGuid)
+
+    @guid.setter
+    def guid(self, guid: uuid.UUID):
+        self.rawGuid = guid.bytes_le
+
+    def buildEntry(self, guid: str | bytes, crc: int, name: str, attributeValues: list, langs: list[str], hash: int = 0, index: int = 0):
+        """use for file modification
+
+        @param guid: guid string, or raw guid bytes (bytes_le)
+        """
+        self.rawGuid = guid if isinstance(guid, bytes) else strToGuid(guid)
         self.crc = crc
         if isVersionEntryByHash(self.version):
             self.hash = hash
@@ -241,6 +434,389 @@ class Entry:
         self.langs = langs
 
 
+class SharedField(Sequence):
+    """read-only view of the attributes / langs of a shared entry, every read goes to the entry so nothing is copied
+    (and strings of a LazyEntry are only decoded when read)"""
+
+    __slots__ = ("entry", "field")
+
+    def __init__(self, entry: Entry, field: str):
+        self.entry = entry
+        self.field = field
+
+    def __getitem__(self, index):
+        return getattr(self.entry, self.field)[index]
+
+    def __len__(self) -> int:
+        return len(getattr(self.entry, self.field))
+
+    def __iter__(self) -> Iterator:
+        return iter(getattr(self.entry, self.field))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, tuple, Sequence)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __add__(self, other: list) -> list:
+        return list(self) + list(other)
+
+    def __radd__(self, other: list) -> list:
+        return list(other) + list(self)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class SharedEntry(Entry):
+    """read-only view of an entry of another MSG, used by MSGOverlay until the entry is edited.
+
+    attributes / langs are handed out as SharedField views, so writing through them raises instead of changing the shared entry"""
+
+    __slots__ = ("entry", "_attributes", "_langs")
+
+    def __init__(self, entry: Entry):
+        self.entry = entry
+        self._attributes = SharedField(entry, "attributes")
+        self._langs = SharedField(entry, "langs")
+
+    version = property(lambda self: self.entry.version)
+    rawGuid = property(lambda self: self.entry.rawGuid)
+    crc = property(lambda self: self.entry.crc)
+    hash = property(lambda self: self.entry.hash)
+    index = property(lambda self: self.entry.index)
+    name = property(lambda self: self.entry.name)
+    attributes = property(lambda self: self._attributes)
+    langs = property(lambda self: self._langs)
+
+    def copy(self) -> Entry:
+        return self.entry.copy()
+
+
+class LazyLangs(MutableSequence):
+    """contents of a LazyEntry, each lang is only decoded from the string pool when first read"""
+
+    __slots__ = ("pool", "offsets", "values", "edited")
+
+    def __init__(self, pool: helper.StringPool, offsets: list[int]):
+        self.pool = pool
+        self.offsets: list[int | None] = offsets
+        """local offset in string pool of each lang, None if it is set after reading"""
+        self.values: list[str | None] = [None] * len(offsets)
+        self.edited = False
+        """modified after reading"""
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list([self[i] for i in range(*index.indices(len(self)))])
+        value = self.values[index]
+        if value is None:
+            try:
+                value = self.pool.seek(self.offsets[index])
+            except AssertionError:
+                langIndex = range(len(self))[index]
+                logging.warning(f"error when seeking content at lang {LANG_LIST.get(langIndex, langIndex)}[{langIndex}] in offset {self.offsets[index]}.\n The content has been set to !!MsgNotFoundByREMSG!!")
+                value = "!!MsgNotFoundByREMSG!!"
+            self.values[index] = value
+        return value
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            raise TypeError("slice assignment is not supported")
+        self.values[index] = value
+        self.offsets[index] = None
+        self.edited = True
+
+    def __delitem__(self, index):
+        del self.values[index]
+        del self.offsets[index]
+        self.edited = True
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def insert(self, index, value):
+        self.values.insert(index, value)
+        self.offsets.insert(index, None)
+        self.edited = True
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (list, LazyLangs)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __add__(self, other: list) -> list:
+        return list(self) + list(other)
+
+    def __radd__(self, other: list) -> list:
+        return list(other) + list(self)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+class LazyEntry(Entry):
+    """Entry read in lazy mode, name / langs / string attributes are only decoded from the string pool when first read"""
+
+    __slots__ = ("pool", "_nameOffset", "_name", "_attributes", "_lazyCodec")
+
+    def __init__(self, version):
+        super().__init__(version)
+        self.pool: helper.StringPool = None
+        self._nameOffset: int = None
+        """local offset of entry name, None once the name is decoded"""
+        self._name: str = None
+        self._attributes: list = None
+        self._lazyCodec: AttributeCodec = None
+        """not None until string attributes are decoded"""
+
+    def setLazyStrings(self, pool: helper.StringPool, table: "EntryTable", index: int, dataOffset: int, codec: AttributeCodec):
+        """use when reading file only, keep local offsets to the string pool instead of the strings"""
+        self.pool = pool
+        self._nameOffset = table.entryNameOffsets[index] - dataOffset
+        self.langs = LazyLangs(pool, list([offsets[index] - dataOffset for offsets in table.contentOffsetsByLangs]))
+        for i in codec.nullIndexes + codec.wstringIndexes:
+            self._attributes[i] -= dataOffset
+        self._lazyCodec = codec
+
+    @property
+    def name(self) -> str:
+        if self._nameOffset is not None:
+            self._name = self.pool.seek(self._nameOffset)
+            self._nameOffset = None
+        return self._name
+
+    @name.setter
+    def name(self, name: str):
+        self._name = name
+        self._nameOffset = None
+
+    @property
+    def attributes(self) -> list:
+        if self._lazyCodec is not None:
+            # seek string value of each attribute
+            for i in self._lazyCodec.wstringIndexes:
+                self._attributes[i] = self.pool.seek(self._attributes[i])
+            for i in self._lazyCodec.nullIndexes:
+                temp = self.pool.seek(self._attributes[i])
+                assert temp == "" or temp == "\x00", f"attr value type -1 contain non-null value {temp}"
+                self._attributes[i] = temp
+            self._attributes = TrackedList(self._attributes)
+            self._lazyCodec = None
+        return self._attributes
+
+    @attributes.setter
+    def attributes(self, attributes: list):
+        self._attributes = attributes
+        self._lazyCodec = None
+
+    def isStringsEdited(self, name: str | None) -> bool:
+        # nothing is decoded for a part never read
+        attributes = self._attributes
+        langs = self.langs
+        return (
+            (self._nameOffset is None and self._name is not name)
+            or (self._lazyCodec is None and (type(attributes) is not TrackedList or attributes.edited))
+            or type(langs) is not LazyLangs
+            or langs.edited
+        )
+
+
+class EntryTable:
+    """columnar form of all entry heads in a msg, one array per field.
+
+    entry heads are fixed size and 8 bytes aligned, so each field is a strided slice of the head block
+    (as uint64: guid[0:2], crc|hashOrIndex[2], entryNameOffset[3], attributeOffset[4], contentOffsetsByLangs[5:])"""
+
+    def __init__(self, version: int, langCount: int):
+        self.version = version
+        self.langCount = langCount
+        self.stride = 5 + langCount
+        """entry head size in uint64"""
+        self.offset = 0
+        """file offset of the entry heads"""
+        self.guids: list[bytes] = list()
+        self.crcs = array("I")
+        self.hashOrIndexes = array("I")
+        self.entryNameOffsets = array("Q")
+        self.attributeOffsets = array("Q")
+        self.contentOffsetsByLangs: list[array] = list([array("Q") for _ in range(langCount)])
+
+    def __len__(self) -> int:
+        return len(self.guids)
+
+    def readTable(self, buffer: bytes | memoryview, offset: int, entryCount: int, keysOnly: bool = False):
+        """load all entry heads at offset, straight from the file bytes
+
+        @param keysOnly: only load the columns to find an entry by (guid, hash or index, entryNameOffset), see readRow for the rest.
+        """
+        headSize = self.stride * 8
+        block = memoryview(buffer)[offset : offset + entryCount * headSize]
+        assert len(block) == entryCount * headSize, f"expected {entryCount} entry heads at {offset} but file ends at {offset + len(block)}"
+        self.offset = offset
+        self.guids = list([bytes(block[i : i + 16]) for i in range(0, len(block), headSize)])
+        uint64s = block.cast("Q")
+        uint32s = block.cast("I")
+        self.hashOrIndexes = _toColumn("I", uint32s[5 :: self.stride * 2])
+        self.entryNameOffsets = _toColumn("Q", uint64s[3 :: self.stride])
+        if keysOnly:
+            return
+        self.crcs = _toColumn("I", uint32s[4 :: self.stride * 2])
+        self.attributeOffsets = _toColumn("Q", uint64s[4 :: self.stride])
+        self.contentOffsetsByLangs = list([_toColumn("Q", uint64s[5 + i :: self.stride]) for i in range(self.langCount)])
+
+    def readRow(self, buffer: bytes | memoryview, index: int) -> "EntryTable":
+        """unpack the whole head of one entry of this table, return it as a table of that entry only"""
+        headStruct = getEntryHeadStruct(self.langCount)
+        guid, crc, hashOrIndex, entryNameOffset, attributeOffset, *contentOffsets = headStruct.unpack_from(buffer, self.offset + index * headStruct.size)
+        row = EntryTable(self.version, self.langCount)
+        row.offset = self.offset + index * headStruct.size
+        row.guids = list([guid])
+        row.crcs = array("I", [crc])
+        row.hashOrIndexes = array("I", [hashOrIndex])
+        row.entryNameOffsets = array("Q", [entryNameOffset])
+        row.attributeOffsets = array("Q", [attributeOffset])
+        row.contentOffsetsByLangs = list([array("Q", [contentOffset]) for contentOffset in contentOffsets])
+        return row
+
+    def writeTable(self) -> bytes:
+        """pack all columns back to the entry heads block"""
+        entryCount = len(self.guids)
+        block = array("Q", [0]) * (entryCount * self.stride)
+        uint64s = memoryview(block)
+        uint32s = uint64s.cast("B").cast("I")
+        uint32s[4 :: self.stride * 2] = _fromColumn("I", self.crcs)
+        uint32s[5 :: self.stride * 2] = _fromColumn("I", self.hashOrIndexes)
+        uint64s[3 :: self.stride] = _fromColumn("Q", self.entryNameOffsets)
+        uint64s[4 :: self.stride] = _fromColumn("Q", self.attributeOffsets)
+        for i, offsets in enumerate(self.contentOffsetsByLangs):
+            uint64s[5 + i :: self.stride] = _fromColumn("Q", offsets)
+        bytesView = uint64s.cast("B")
+        for i, guid in enumerate(self.guids):
+            bytesView[i * self.stride * 8 : i * self.stride * 8 + 16] = guid
+        return block.tobytes()
+
+    def fillFromEntrys(self, entrys: list[Entry]):
+        """fill guid, crc and hash/index columns from entries, offsets are left for the writer"""
+        self.guids = list([entry.rawGuid for entry in entrys])
+        self.crcs = array("I", [entry.crc for entry in entrys])
+        if isVersionEntryByHash(self.version):
+            self.hashOrIndexes = array("I", [entry.hash for entry in entrys])
+        else:
+            self.hashOrIndexes = array("I", [entry.index for entry in entrys])
+
+    def duplicateGuids(self) -> list[int]:
+        """index of entries which guid already used by a previous entry"""
+        if len(set(self.guids)) == len(self.guids):
+            return list()
+        seen = set()
+        return list([i for i, guid in enumerate(self.guids) if guid in seen or seen.add(guid)])
+
+    def verifyHashOrIndexes(self, names: list[str]) -> list[int]:
+        """index of entries which hash(by name) or index mismatch"""
+        if isVersionEntryByHash(self.version):
+            expected = array("I", map(hashName, names))
+        else:
+            expected = array("I", range(len(self.hashOrIndexes)))
+        if expected == self.hashOrIndexes:
+            return list()
+        return list([i for i, (x, y) in enumerate(zip(expected, self.hashOrIndexes)) if x != y])
+
+
+def _toColumn(typecode: str, view: memoryview) -> array:
+    """copy a strided little endian memoryview into an array"""
+    # tobytes gathers the strided items in C, array(typecode, view) would iterate them one by one
+    column = array(typecode)
+    column.frombytes(view.tobytes())
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column
+
+
+def _fromColumn(typecode: str, column: array) -> array:
+    """array ready to assign into a little endian memoryview"""
+    if sys.byteorder != "little":
+        column = array(typecode, column)
+        column.byteswap()
+    return column
+
+
+class SourcePool:
+    """string pool and entry tables of the msg file a MSG object was read from, let the writer keep the original strings
+    and entry heads where they are"""
+
+    __slots__ = ("version", "rawPool", "rawTables", "pool", "entrys", "guids", "crcs", "hashOrIndexes", "entryNameOffsets", "_strOffsets")
+
+    def __init__(self, version: int, rawPool: bytes, pool: helper.StringPool, table: "EntryTable", rawTables: bytes | None = None, entrys: list[Entry] = (), decoded: bool = False):
+        """kept by readMSGFromBuffer(keepSourcePool=True)
+
+        @param pool: the decrypted pool, shared with the lazy entries if any.
+        @param table: entry table as read, only the columns to check the entry heads are kept.
+        @param rawTables: everything before the pool as in file, None if the file layout is not checked when reading.
+        @param decoded: all strings of the pool are in pool.stringDict already.
+        """
+        self.version = version
+        self.rawPool: bytes = rawPool
+        """the pool as stored in file, encrypted if the version is encrypted"""
+        self.pool = pool
+        self.rawTables = rawTables
+        self.entrys: tuple[Entry, ...] = tuple(entrys)
+        """entries as read"""
+        self.guids = table.guids
+        self.crcs = table.crcs
+        self.hashOrIndexes = table.hashOrIndexes
+        self.entryNameOffsets = table.entryNameOffsets
+        self._strOffsets: dict[str, int] | None = self._toStrOffsets(pool.stringDict) if decoded else None
+
+    @staticmethod
+    def _toStrOffsets(stringDict: dict[int, str]) -> dict[str, int]:
+        # inserted backward so the first offset of a duplicated string wins
+        return dict(zip(reversed(stringDict.values()), reversed(stringDict.keys())))
+
+    @property
+    def strOffsets(self) -> dict[str, int]:
+        """local offset of each string in the pool, decoded on first use if not yet"""
+        if self._strOffsets is None:
+            self._strOffsets = self._toStrOffsets(helper.wcharPool2StrDict(self.pool.wcharPool))
+        return self._strOffsets
+
+    def findString(self, string: str) -> int | None:
+        """local offset of string, only looked up if the whole pool is decoded already, None if not found"""
+        return None if self._strOffsets is None else self._strOffsets.get(string)
+
+    def seek(self, offset: int) -> str | None:
+        """string at local offset, None if no string start there"""
+        try:
+            return self.pool.seek(offset)
+        except AssertionError:
+            return None
+
+    def isUntouched(self, index: int, entry: Entry) -> bool:
+        """if entry is the entry read at index (or a SharedEntry of it), and not modified since"""
+        if type(entry) is SharedEntry:
+            entry = entry.entry
+        if index >= len(self.entrys) or entry is not self.entrys[index]:
+            return False
+        hashOrIndex = entry.hash if isVersionEntryByHash(entry.version) else entry.index
+        if entry.rawGuid is not self.guids[index] or entry.crc != self.crcs[index] or hashOrIndex != self.hashOrIndexes[index]:
+            return False
+        return not entry.isStringsEdited(self.pool.stringDict.get(self.entryNameOffsets[index] - len(self.rawTables)))
+
+    def isSameLayout(self, version: int, entryCount: int, valueTypes: tuple[int, ...], langCount: int) -> bool:
+        """if entry heads and attributes of such a msg would be at the same place as in the source file, with the same attribute types"""
+        if self.rawTables is None:
+            return False
+        sourceVersion, _, _, sourceEntryCount, attributeCount, sourceLangCount = HEADER_STRUCT.unpack_from(self.rawTables, 0)
+        if (sourceVersion, sourceEntryCount, attributeCount, sourceLangCount) != (version, entryCount, len(valueTypes), langCount):
+            return False
+        layout = calcLayout(version, entryCount, attributeCount, langCount)
+        return len(self.rawTables) == layout["dataOffset"] and getArrayStruct("i", attributeCount).unpack_from(self.rawTables, layout["attributeOffset"]) == valueTypes
+
+    def __deepcopy__(self, memo):
+        # never modified after reading, copies of a MSG object can share it
+        return self
+
+
 class MSG:
     """MSG object"""
 
@@ -250,235 +826,482 @@ class MSG:
         self.version: int = None
         self.languages: list[int] = None
         self.hasDI: bool = False
+        self.sourcePool: SourcePool = None
+        """string pool of the file this object read from, only kept when asked, see writeMSG(incremental=True)"""
         pass
 
-    def readMSG(self, filestream: io.BufferedReader):
+    def editEntry(self, index: int) -> Entry:
+        """the entry at index, to be modified"""
+        return self.entrys[index]
+
+    def readEntrys(self) -> list[Entry]:
+        """entries to read only, with SharedEntry views replaced by the entries they view (faster to read)"""
+        return list([entry.entry if type(entry) is SharedEntry else entry for entry in self.entrys])
+
+    def readMSG(self, filestream: io.BufferedReader, lazy: bool = False, validation: str = VALIDATION_FULL, keepSourcePool: bool = False):
         """read msg file and store info into this MSG object"""
+        self.readMSGFromBuffer(filestream.read(), lazy, validation, keepSourcePool)
+
+    def readTables(self, buffer: bytes | memoryview, validation: str = VALIDATION_FULL, keysOnly: bool = False) -> tuple[EntryTable, tuple[int, ...], int]:
+        """read everything before the string pool, and set version / languages / attributeHeaders(without name) of this MSG object
+
+        @param keysOnly: only read the entry table columns to find an entry by, see EntryTable.readTable.
+        attributeOffsets of the entries are not checked then.
+
+        return entry table, attributeNamesOffsets and dataOffset"""
+
+        assert validation in VALIDATION_LEVELS, f"unknown validation level {validation}"
+        structural = validation != VALIDATION_NONE
+        padAlignUp = pad_align_up_buffer if structural else lambda buffer, offset, align: alignUp(offset, align)
 
         # header
-        (version,) = struct.unpack("<I", filestream.read(4))
-        (magic,) = struct.unpack("<4s", filestream.read(4))
-        (headerOffset,) = struct.unpack("<Q", filestream.read(8))
-        (entryCount,) = struct.unpack("<I", filestream.read(4))
-        (attributeCount,) = struct.unpack("<I", filestream.read(4))
-        (langCount,) = struct.unpack("<I", filestream.read(4))
-        pad_align_up(filestream, 8)  # pad to 8
+        version, magic, headerOffset, entryCount, attributeCount, langCount = HEADER_STRUCT.unpack_from(buffer, 0)
+        pos = padAlignUp(buffer, HEADER_STRUCT.size, 8)  # pad to 8
         if isVersionEncrypt(version):
-            (dataOffset,) = struct.unpack("<Q", filestream.read(8))
-        (unknDataOffset,) = struct.unpack("<Q", filestream.read(8))
-        (langOffset,) = struct.unpack("<Q", filestream.read(8))
-        (attributeOffset,) = struct.unpack("<Q", filestream.read(8))
-        (attributeNameOffset,) = struct.unpack("<Q", filestream.read(8))
+            dataOffset, unknDataOffset, langOffset, attributeOffset, attributeNameOffset = SECTION_OFFSETS_STRUCT_ENCRYPT.unpack_from(buffer, pos)
+            pos += SECTION_OFFSETS_STRUCT_ENCRYPT.size
+        else:
+            unknDataOffset, langOffset, attributeOffset, attributeNameOffset = SECTION_OFFSETS_STRUCT.unpack_from(buffer, pos)
+            pos += SECTION_OFFSETS_STRUCT.size
 
         # entries headers' offset
-        entryOffsets: list[int] = list()
-        for _ in range(entryCount):
-            entryOffsets.append(struct.unpack("<Q", filestream.read(8))[0])
+        entryOffsetsStruct = getArrayStruct("Q", entryCount)
+        entryOffsets: tuple[int, ...] = entryOffsetsStruct.unpack_from(buffer, pos)
+        pos += entryOffsetsStruct.size
 
         # always 64bit null
-        if unknDataOffset != 0:
-            assert unknDataOffset == filestream.tell(), f"expected unknData at {unknDataOffset} but at {filestream.tell()}"
-        (unknData,) = struct.unpack("<Q", filestream.read(8))
-        assert unknData == 0, f"unknData should be 0 but found {unknData}"
+        if structural:
+            if unknDataOffset != 0:
+                assert unknDataOffset == pos, f"expected unknData at {unknDataOffset} but at {pos}"
+            (unknData,) = UINT64.unpack_from(buffer, pos)
+            assert unknData == 0, f"unknData should be 0 but found {unknData}"
+        pos += UINT64.size
 
         # indexes of all lang (follow via.Language)
-        assert langOffset == filestream.tell(), f"expected languages at {langOffset} but at {filestream.tell()}"
+        assert not structural or langOffset == pos, f"expected languages at {langOffset} but at {pos}"
         # keep in mind `languages` is a list of indexes could be duplicated and not in sequence now
-        languages: list[int] = list()
-        for _ in range(langCount):
-            languages.append(struct.unpack("<i", filestream.read(4))[0])
+        languagesStruct = getArrayStruct("i", langCount)
+        languages: list[int] = list(languagesStruct.unpack_from(buffer, pos))
+        pos += languagesStruct.size
         if not all([x in LANG_LIST.keys() and (i == x or x == -1) for i, x in enumerate(languages)]):
             print(f"unkn lang found. {str(languages)}. Please update LANG_LIST from via.Language")
 
         # pad to 8
-        pad_align_up(filestream, 8)
+        pos = padAlignUp(buffer, pos, 8)
 
         # get attribute headers, get type of each attr
-        assert attributeOffset == filestream.tell(), f"expected attributeValueTypes at {attributeOffset} but at {filestream.tell()}"
-        attributeHeaders: list[dict] = list()
-        for i in range(attributeCount):
-            attributeHeaders.append(dict(valueType=struct.unpack("<i", filestream.read(4))[0]))
+        assert not structural or attributeOffset == pos, f"expected attributeValueTypes at {attributeOffset} but at {pos}"
+        attributeTypesStruct = getArrayStruct("i", attributeCount)
+        attributeHeaders: list[dict] = list([dict(valueType=valueType) for valueType in attributeTypesStruct.unpack_from(buffer, pos)])
+        pos += attributeTypesStruct.size
 
         # pad to 8
-        pad_align_up(filestream, 8)
+        pos = padAlignUp(buffer, pos, 8)
 
         # get attribute headers' name but hold the offset at attributeNamesOffsets. string reading will do after decrypt.
-        assert attributeNameOffset == filestream.tell(), f"expected attributeNamesOffset at {attributeNameOffset} but at {filestream.tell()}"
-        attributeNamesOffsets = list()
-        for _ in range(attributeCount):
-            attributeNamesOffsets.append(struct.unpack("<Q", filestream.read(8))[0])
+        assert not structural or attributeNameOffset == pos, f"expected attributeNamesOffset at {attributeNameOffset} but at {pos}"
+        attributeNamesOffsetsStruct = getArrayStruct("Q", attributeCount)
+        attributeNamesOffsets = attributeNamesOffsetsStruct.unpack_from(buffer, pos)
+        pos += attributeNamesOffsetsStruct.size
 
         # get info(entry head) of each entry
-        entrys: list[Entry] = list()
-        for entryIndex in range(entryCount):
-            assert entryOffsets[entryIndex] == filestream.tell(), f"expected entryOffsets[{entryIndex}] at {entryOffsets[entryIndex]} but at {filestream.tell()}"
-            entry = Entry(version)
-            entry.readHead(filestream, langCount)
-            entrys.append(entry)
+        entryHeadSize = getEntryHeadStruct(langCount).size
+        if structural:
+            for entryIndex in range(entryCount):
+                assert entryOffsets[entryIndex] == pos + entryIndex * entryHeadSize, f"expected entryOffsets[{entryIndex}] at {entryOffsets[entryIndex]} but at {pos + entryIndex * entryHeadSize}"
+        table = EntryTable(version, langCount)
+        table.readTable(buffer, pos, entryCount, keysOnly)
+        pos += entryCount * entryHeadSize
 
-        # get attributes of each entry
-        for entry in entrys:
-            assert entry.attributeOffset == filestream.tell(), f"expected entry.attributeOffset at {self.attributeOffset} but at {filestream.tell()}"
-            entry.readAttributes(filestream, attributeHeaders)
+        # attributes of each entry are right after entry heads
+        if structural and not keysOnly:
+            for entryAttributeOffset in table.attributeOffsets:
+                assert entryAttributeOffset == pos, f"expected entry.attributeOffset at {entryAttributeOffset} but at {pos}"
+                pos += 8 * attributeCount
+        else:
+            pos += 8 * attributeCount * entryCount
 
-        # read / decrypt string pool
+        # string pool
         if isVersionEncrypt(version):
-            assert dataOffset == filestream.tell(), f"expected dataOffset at {dataOffset} but at {filestream.tell()}"
+            assert not structural or dataOffset == pos, f"expected dataOffset at {dataOffset} but at {pos}"
         else:
-            dataOffset = filestream.tell()
-        filestream.seek(0, 2)  # EOF
-        dataSize = filestream.tell() - dataOffset
-        assert dataSize % 2 == 0, f"wstring pool size should be even: {dataSize}"
-        filestream.seek(dataOffset)  # start of string pool
-        data = filestream.read(dataSize)
+            dataOffset = pos
+        if structural:
+            dataSize = len(buffer) - dataOffset
+            assert dataSize % 2 == 0, f"wstring pool size should be even: {dataSize}"
+
+        self.attributeHeaders: list[dict] = attributeHeaders
+        self.version: int = version
+        self.languages: list[int] = languages
+        return table, attributeNamesOffsets, dataOffset
+
+    def readMSGFromBuffer(self, buffer: bytes | memoryview | mmap.mmap, lazy: bool = False, validation: str = VALIDATION_FULL, keepSourcePool: bool = False):
+        """read the whole msg file content (bytes, or a mmap) and store info into this MSG object.
+        the file content is only read in place, no reference to it is kept after reading.
+
+        @param lazy: keep the decrypted string pool and decode each string only when it is first read, see LazyEntry.
+        @param validation: one of VALIDATION_LEVELS, how much of the file get checked while reading.
+        @param keepSourcePool: keep a copy of the string pool and entry tables as in file, for writeMSG(incremental=True).
+        """
+
+        buffer = memoryview(buffer)
+        table, attributeNamesOffsets, dataOffset = self.readTables(buffer, validation)
+        version = self.version
+        attributeHeaders = self.attributeHeaders
+        codec = getAttributeCodecByHeaders(attributeHeaders)
+
+        # get info(entry head) and attributes of each entry, attributes of all entries are stored one after another (checked in readTables)
+        entrys: list[Entry] = list()
+        attributesOffset = table.attributeOffsets[0] if len(table) > 0 else 0
+        for entryIndex, attributes in enumerate(codec.unpackAll(buffer, attributesOffset, len(table))):
+            entry = LazyEntry(version) if lazy else Entry(version)
+            entry.readHead(table, entryIndex)
+            entry.attributes = attributes
+            entrys.append(entry)
+        self.entrys: list[Entry] = entrys
+
+        # read / decrypt string pool, decrypt into one buffer directly to avoid copies of the whole pool
+        data = buffer[dataOffset:]
         if isVersionEncrypt(version):
-            wcharPool = helper.decrypt(data)
+            wcharPool = bytearray(len(data))
+            helper.blockDecryptInto(data, wcharPool)
+            rawPool = bytes(data) if keepSourcePool else None
         else:
-            wcharPool = data
+            wcharPool = bytes(data)
+            rawPool = wcharPool
+        data.release()
+
+        rawTables = bytes(buffer[:dataOffset]) if keepSourcePool and validation != VALIDATION_NONE else None
+        if lazy:
+            pool = helper.StringPool(wcharPool)
+            if keepSourcePool:
+                self.sourcePool = SourcePool(version, rawPool, pool, table, rawTables, entrys)
+            # read attribute name to attributeHeaders
+            for i, attrHead in enumerate(attributeHeaders):
+                attrHead["name"] = pool.seek(attributeNamesOffsets[i] - dataOffset)
+            # strings of each entry are decoded when first read
+            for entryIndex, entry in enumerate(entrys):
+                entry.setLazyStrings(pool, table, entryIndex, dataOffset, codec)
+            # verify all hash / index at once, only entry names get decoded here
+            if validation == VALIDATION_FULL:
+                self.verifyHashOrIndexes(table, entrys)
+            return
+
         stringDict = helper.wcharPool2StrDict(wcharPool)
+        if keepSourcePool:
+            pool = helper.StringPool(wcharPool)
+            pool.stringDict = stringDict
+            self.sourcePool = SourcePool(version, rawPool, pool, table, rawTables, entrys, decoded=True)
 
         # read attribute name to attributeHeaders
         for i, attrHead in enumerate(attributeHeaders):
             attrHead["name"] = helper.seekString((attributeNamesOffsets[i] - dataOffset), stringDict)
+        # set entry name of each entry, then verify all hash / index at once
+        for entry, entryNameOffset in zip(entrys, table.entryNameOffsets):
+            entry.setName(helper.seekString((entryNameOffset - dataOffset), stringDict))
+        if validation == VALIDATION_FULL:
+            self.verifyHashOrIndexes(table, entrys)
+
         # get content of each entry
         for entryIndex, entry in enumerate(entrys):
-            # set entry name
-            entry.setName(helper.seekString((entry.entryNameOffset - dataOffset), stringDict))
-            if isVersionEntryByHash(version):
-                nameHash = mmh3.hash(key=entry.name.encode("utf-16-le"), seed=0xFFFFFFFF, signed=False)
-                assert nameHash == entry.hash, f"expected {entry.hash} for {entry.name} but get {nameHash}"
-            else:
-                assert entryIndex == entry.index, f"expected {entryIndex} for {entry.name} but get {entry.index}"
-
             # set content by each lang
             lang = list()
-            for strOffset in entry.contentOffsetsByLangs:
+            for langIndex, offsets in enumerate(table.contentOffsetsByLangs):
+                strOffset = offsets[entryIndex]
                 try:
                     lang.append(helper.seekString((strOffset - dataOffset), stringDict))
                 except AssertionError:
-                    logging.warning(f"error when seeking content for entry {entry.name} at lang {LANG_LIST[entry.contentOffsetsByLangs.index(strOffset)]}[{entry.contentOffsetsByLangs.index(strOffset)}] in offset {strOffset}.\n The content has been set to !!MsgNotFoundByREMSG!!")
+                    logging.warning(f"error when seeking content for entry {entry.name} at lang {LANG_LIST[langIndex]}[{langIndex}] in offset {strOffset}.\n The content has been set to !!MsgNotFoundByREMSG!!")
                     lang.append("!!MsgNotFoundByREMSG!!")
-            entry.setContent(lang)
+            entry.setContent(TrackedList(lang) if keepSourcePool else lang)
 
             # seek string value of each attribute
-            for i, attrHead in enumerate(attributeHeaders):
-                if attrHead["valueType"] == 2:
-                    entry.attributes[i] = helper.seekString((entry.attributes[i] - dataOffset), stringDict)
-                elif attrHead["valueType"] == -1:
-                    temp = helper.seekString((entry.attributes[i] - dataOffset), stringDict)
-                    assert temp == "" or temp == "\x00", f"attr value type -1 contain non-null value {temp}"
-                    entry.attributes[i] = temp
-
-        self.entrys: list[Entry] = entrys
-        self.attributeHeaders: list[dict] = attributeHeaders
-        self.version: int = version
-        self.languages: list[int] = languages
+            attributes = entry.attributes
+            for i in codec.wstringIndexes:
+                attributes[i] = helper.seekString((attributes[i] - dataOffset), stringDict)
+            for i in codec.nullIndexes:
+                temp = helper.seekString((attributes[i] - dataOffset), stringDict)
+                assert temp == "" or temp == "\x00", f"attr value type -1 contain non-null value {temp}"
+                attributes[i] = temp
+            if keepSourcePool:
+                entry.attributes = TrackedList(attributes)
 
         # debug use, to let input output stringpool keeps same
         # self.stringDict = stringDict
 
-    def writeMSG(self) -> bytes:
-        """write a msg file(bytes) from this object's info"""
+    def readEntry(self, buffer: bytes | memoryview, nameOrGuid: str | uuid.UUID | bytes, validation: str = VALIDATION_STRUCTURAL) -> "LazyEntry | None":
+        """find one entry by entry name or guid and return it, or None if not found.
+
+        only the columns to find the entry by are read from the entry table, then the head of the found entry,
+        and only the bytes of the strings being read get decrypted / decoded.
+        version / languages / attributeHeaders of this MSG object are set as well, but not entrys.
+
+        @param validation: one of VALIDATION_LEVELS, hash / index of entries are never checked here,
+        and only the attributeOffset of the found entry is.
+        """
+
+        buffer = memoryview(buffer)
+        table, attributeNamesOffsets, dataOffset = self.readTables(buffer, validation, keysOnly=True)
+        if isVersionEncrypt(self.version):
+            pool = helper.EncryptedStringPool(buffer[dataOffset:])
+        else:
+            pool = helper.ChunkedStringPool(buffer[dataOffset:])
+
+        entryIndex = None
+        if isinstance(nameOrGuid, (uuid.UUID, bytes)):
+            guid = nameOrGuid.bytes_le if isinstance(nameOrGuid, uuid.UUID) else nameOrGuid
+            if guid in table.guids:
+                entryIndex = table.guids.index(guid)
+        elif isVersionEntryByHash(self.version):
+            nameHash = hashName(nameOrGuid)
+            for i, entryHash in enumerate(table.hashOrIndexes):
+                if entryHash == nameHash and pool.seek(table.entryNameOffsets[i] - dataOffset) == nameOrGuid:
+                    entryIndex = i
+                    break
+        else:
+            for i, entryNameOffset in enumerate(table.entryNameOffsets):
+                if pool.seek(entryNameOffset - dataOffset) == nameOrGuid:
+                    entryIndex = i
+                    break
+        if entryIndex is None:
+            return None
+
+        for i, attrHead in enumerate(self.attributeHeaders):
+            attrHead["name"] = pool.seek(attributeNamesOffsets[i] - dataOffset)
+        codec = getAttributeCodecByHeaders(self.attributeHeaders)
+        row = table.readRow(buffer, entryIndex)
+        if validation != VALIDATION_NONE:
+            attributeOffset = table.offset + len(table) * row.stride * 8 + entryIndex * codec.size
+            assert row.attributeOffsets[0] == attributeOffset, f"expected entry.attributeOffset at {row.attributeOffsets[0]} but at {attributeOffset}"
+        entry = LazyEntry(self.version)
+        entry.readHead(row, 0)
+        entry.readAttributes(buffer, row.attributeOffsets[0], codec)
+        entry.setLazyStrings(pool, row, 0, dataOffset, codec)
+        return entry
+
+    @staticmethod
+    def verifyHashOrIndexes(table: EntryTable, entrys: list[Entry]):
+        """assert hash(by name) / index of all entries are correct"""
+        for entryIndex in table.verifyHashOrIndexes([entry.name for entry in entrys]):
+            entry = entrys[entryIndex]
+            if isVersionEntryByHash(entry.version):
+                nameHash = hashName(entry.name)
+                assert nameHash == entry.hash, f"expected {entry.hash} for {entry.name} but get {nameHash}"
+            else:
+                assert entryIndex == entry.index, f"expected {entryIndex} for {entry.name} but get {entry.index}"
+
+    def iterStrings(self) -> Iterator[str]:
+        """all strings of this msg to be stored in string pool, in the order they are first seen (duplicates included)"""
+
+        def stringGroups():
+            isStrAttrIdx = list([i for i, a in enumerate(self.attributeHeaders) if a["valueType"] == 2])
+            if any([a["valueType"] == -1 for a in self.attributeHeaders]):
+                yield ("",)
+            yield [a["name"] for a in self.attributeHeaders]
+            for entry in self.readEntrys():
+                yield (entry.name,)
+                yield entry.langs
+                if len(isStrAttrIdx) > 0:
+                    yield [entry.attributes[idx] for idx in isStrAttrIdx]
+
+        return itertools.chain.from_iterable(stringGroups())
+
+    def writeMSG(self, incremental: bool = False) -> memoryview:
+        """write a msg file(bytes) from this object's info.
+
+        the layout of the whole file is planned first, then everything get packed into one preallocated buffer,
+        the returned memoryview is a view of that buffer, not a copy.
+
+        @param incremental: reuse the string pool of the source file (see readMSG keepSourcePool), strings already
+        in it keep their offsets and order, only new strings get encoded, appended (in first-seen order, no sorting)
+        and encrypted. unmodified files are written back byte identical. default is a sorted new pool.
+        if the entry count and attribute types are not changed, see patchMSG.
+        """
 
-        # header
-        newFile = bytearray()
-        newFile.extend(struct.pack("<I", self.version))
-        newFile.extend(struct.pack("<4s", b"GMSG"))
-        newFile.extend(struct.pack("<Q", 16))
         entryCount = len(self.entrys)
-        newFile.extend(struct.pack("<I", entryCount))
         attributeCount = len(self.attributeHeaders)
-        newFile.extend(struct.pack("<I", attributeCount))
         langCount = len(self.languages)
-        newFile.extend(struct.pack("<I", langCount))
-        newFile.extend(b"\x00" * (len(newFile) % 8))  # pad to 8
-        if isVersionEncrypt(self.version):
-            dataOffsetPH = len(newFile)
-            newFile.extend(struct.pack("<q", -1))
-        unknDataOffsetPH = len(newFile)
-        newFile.extend(struct.pack("<q", -1))
-        langOffsetPH = len(newFile)
-        newFile.extend(struct.pack("<q", -1))
-        attributeOffsetPH = len(newFile)
-        newFile.extend(struct.pack("<q", -1))
-        attributeNameOffsetPH = len(newFile)
-        newFile.extend(struct.pack("<q", -1))
 
-        # entries headers' offset
-        entryOffsetsPH: list[int] = list()
-        for _ in range(entryCount):
-            entryOffsetsPH.append(len(newFile))
-            newFile.extend(struct.pack("<q", -1))
-
-        newFile[unknDataOffsetPH : unknDataOffsetPH + 8] = struct.pack("<Q", len(newFile))
-        newFile.extend(struct.pack("<Q", 0))  # unknData
-        newFile[langOffsetPH : langOffsetPH + 8] = struct.pack("<Q", len(newFile))
-        newFile.extend(struct.pack("<" + "i" * langCount, *self.languages))  # languages
-
-        newFile.extend(b"\x00" * (len(newFile) % 8))  # pad to 8
-        newFile[attributeOffsetPH : attributeOffsetPH + 8] = struct.pack("<Q", len(newFile))
-        newFile.extend(struct.pack("<" + "i" * attributeCount, *list([head["valueType"] for head in self.attributeHeaders])))  # attributeHeaders.valueType
-        newFile.extend(b"\x00" * (len(newFile) % 8))  # pad to 8
-        newFile[attributeNameOffsetPH : attributeNameOffsetPH + 8] = struct.pack("<Q", len(newFile))
-        attributeNamesOffsetsPH: list[int] = list()
-        for _ in range(attributeCount):
-            attributeNamesOffsetsPH.append(len(newFile))
-            newFile.extend(struct.pack("<q", -1))
+        # plan the whole file, then give each string its file offset
+        layout = calcLayout(self.version, entryCount, attributeCount, langCount)
+        dataOffset = layout["dataOffset"]
+        if incremental:
+            assert self.sourcePool is not None, "incremental write need the source pool, read with keepSourcePool=True"
+            if self.sourcePool.isSameLayout(self.version, entryCount, getAttributeCodecByHeaders(self.attributeHeaders).valueTypes, langCount):
+                return self.patchMSG(layout)
+
+        # construct string pool, a dict as an ordered set to keep the first-seen order of strings
+        stringPoolSet = dict.fromkeys(self.iterStrings())
+        if incremental:
+            rawPool = self.sourcePool.rawPool
+            sourceOffsets = self.sourcePool.strOffsets
+            strOffsetDict = dict(zip(sourceOffsets.keys(), map(dataOffset.__add__, sourceOffsets.values())))
+            newOffsetDict = helper.calcStrPoolOffsets([string for string in stringPoolSet if string not in sourceOffsets], len(rawPool), sort=False)
+        else:
+            rawPool = b""
+            strOffsetDict = dict()
+            newOffsetDict = helper.calcStrPoolOffsets(stringPoolSet)  # not doing string processing here, as it will change the key.
+        wcharPool = b"".join(helper.toWcharBytes(x) for x in newOffsetDict.keys())
+        strOffsetDict.update(zip(newOffsetDict.keys(), map(dataOffset.__add__, newOffsetDict.values())))
+        newFile = bytearray(dataOffset + len(rawPool) + len(wcharPool))
+        self.packHeader(newFile, layout, strOffsetDict)
 
         # info(entry head) of each entry
-        for i, entry in enumerate(self.entrys):
-            newFile[entryOffsetsPH[i] : entryOffsetsPH[i] + 8] = struct.pack("<Q", len(newFile))
-            entry.writeHead(newFile)
+        attributesOffset = layout["attributesOffset"]
+        entryHeadsOffset = layout["entryHeadsOffset"]
+        table = EntryTable(self.version, langCount)
+        entrys = self.readEntrys()
+        table.fillFromEntrys(entrys)
+        table.entryNameOffsets = array("Q", [strOffsetDict[entry.name] for entry in entrys])
+        table.attributeOffsets = array("Q", [attributesOffset + i * 8 * attributeCount for i in range(entryCount)])
+        table.contentOffsetsByLangs = list([array("Q", [strOffsetDict[entry.langs[i]] for entry in entrys]) for i in range(langCount)])
+        newFile[entryHeadsOffset:attributesOffset] = table.writeTable()
 
         # attributes of each entry
-        for i, entry in enumerate(self.entrys):
-            newFile[entry.attributeOffsetPH : entry.attributeOffsetPH + 8] = struct.pack("<Q", len(newFile))
-            entry.writeAttributes(newFile, self.attributeHeaders)
+        codec = getAttributeCodecByHeaders(self.attributeHeaders)
+        offset = attributesOffset
+        for entry in entrys:
+            offset = entry.writeAttributes(newFile, offset, codec, strOffsetDict)
+
+        return self.packPool(newFile, dataOffset, rawPool, wcharPool)
 
-        # read / decrypt string pool
-        dataOffset = len(newFile)
+    def patchMSG(self, layout: dict[str, int]) -> memoryview:
+        """writeMSG(incremental=True) when entry heads and attributes are at the same place as in the source file.
+
+        they are copied from the source file, only the entries edited since reading get packed again, so the cost follow
+        the edits instead of the file size. an entry is taken as not edited only if it is still the entry read (or a SharedEntry
+        of it) with the same head, and its name / attributes / langs are not modified (see SourcePool.isUntouched).
+        strings of the edited entries are compared with the strings at the same place in the source file.
+        """
+
+        source = self.sourcePool
+        dataOffset = layout["dataOffset"]
+        entryHeadsOffset = layout["entryHeadsOffset"]
+        attributesOffset = layout["attributesOffset"]
+        entryHeadStruct = getEntryHeadStruct(len(self.languages))
+        codec = getAttributeCodecByHeaders(self.attributeHeaders)
+        edited = list([i for i, entry in enumerate(self.entrys) if not source.isUntouched(i, entry)])
+
+        strOffsetDict = dict()
+        newStrings = dict()  # as an ordered set
+
+        def useString(string: str, offset: int):
+            """string to write where the source file has the string at (file) offset"""
+            if string in strOffsetDict:
+                return
+            if source.seek(offset - dataOffset) == string:
+                strOffsetDict[string] = offset
+            else:
+                newStrings[string] = None
+
+        for head, offset in zip(self.attributeHeaders, getArrayStruct("Q", len(self.attributeHeaders)).unpack_from(source.rawTables, layout["attributeNameOffset"])):
+            useString(head["name"], offset)
+        for i in edited:
+            entry = self.entrys[i]
+            _, _, _, nameOffset, _, *langOffsets = entryHeadStruct.unpack_from(source.rawTables, entryHeadsOffset + i * entryHeadStruct.size)
+            sourceAttributes = codec.unpack(source.rawTables, attributesOffset + i * codec.size)
+            useString(entry.name, nameOffset)
+            for string, offset in zip(entry.langs, langOffsets):
+                useString(string, offset)
+            attributes = entry.attributes
+            for j in codec.wstringIndexes:
+                useString(attributes[j], sourceAttributes[j])
+            for j in codec.nullIndexes:
+                useString("", sourceAttributes[j])
+
+        # strings not at the same place are looked up in the source pool only if it is decoded already
+        appended = list()
+        for string in newStrings:
+            if string in strOffsetDict:
+                continue
+            offset = source.findString(string)
+            if offset is None:
+                appended.append(string)
+            else:
+                strOffsetDict[string] = dataOffset + offset
+        rawPool = source.rawPool
+        newOffsetDict = helper.calcStrPoolOffsets(appended, len(rawPool), sort=False)
+        wcharPool = b"".join(helper.toWcharBytes(x) for x in newOffsetDict.keys())
+        strOffsetDict.update(zip(newOffsetDict.keys(), map(dataOffset.__add__, newOffsetDict.values())))
+        newFile = bytearray(dataOffset + len(rawPool) + len(wcharPool))
+        self.packHeader(newFile, layout, strOffsetDict)
+
+        newFile[entryHeadsOffset:dataOffset] = memoryview(source.rawTables)[entryHeadsOffset:dataOffset]
+        byHash = isVersionEntryByHash(self.version)
+        for i in edited:
+            entry = self.entrys[i]
+            entryAttributesOffset = attributesOffset + i * codec.size
+            entryHeadStruct.pack_into(
+                newFile, entryHeadsOffset + i * entryHeadStruct.size,
+                entry.rawGuid, entry.crc, entry.hash if byHash else entry.index, strOffsetDict[entry.name], entryAttributesOffset,
+                *[strOffsetDict[string] for string in entry.langs],
+            )
+            entry.writeAttributes(newFile, entryAttributesOffset, codec, strOffsetDict)
+
+        return self.packPool(newFile, dataOffset, rawPool, wcharPool)
+
+    def packHeader(self, newFile: bytearray, layout: dict[str, int], strOffsetDict: dict[str, int]):
+        """fill everything before the entry heads into newFile
+
+        @param strOffsetDict: file offset of each string in string pool, attribute names at least
+        """
+
+        entryCount = len(self.entrys)
+        attributeCount = len(self.attributeHeaders)
+        langCount = len(self.languages)
+
+        # header
+        HEADER_STRUCT.pack_into(newFile, 0, self.version, b"GMSG", 16, entryCount, attributeCount, langCount)
         if isVersionEncrypt(self.version):
-            newFile[dataOffsetPH : dataOffsetPH + 8] = struct.pack("<Q", len(newFile))
-
-        # construct string pool
-        stringPoolSet = set()
-        isStrAttrIdx = list()
-        isNullAttrIdx = list()
-        for i, a in enumerate(self.attributeHeaders):
-            if a["valueType"] == -1:
-                stringPoolSet.add("")
-                isNullAttrIdx.append(i)
-            elif a["valueType"] == 2:
-                isStrAttrIdx.append(i)
-
-        stringPoolSet.update([a["name"] for a in self.attributeHeaders])
-        for entry in self.entrys:
-            stringPoolSet.add(entry.name)
-            stringPoolSet.update(entry.langs)
-            stringPoolSet.update([entry.attributes[idx] for idx in isStrAttrIdx])
-
-        strOffsetDict = helper.calcStrPoolOffsets(stringPoolSet)  # not doing string processing here, as it will change the key.
-        # debug use, to let input output stringpool keeps same
-        # strOffsetDict = dict((v,k) for k,v in self.stringDict.items())
-        wcharPool = b"".join(helper.toWcharBytes(x) for x in strOffsetDict.keys())
+            SECTION_OFFSETS_STRUCT_ENCRYPT.pack_into(newFile, layout["sectionOffsetsOffset"], layout["dataOffset"], layout["unknDataOffset"], layout["langOffset"], layout["attributeOffset"], layout["attributeNameOffset"])
+        else:
+            SECTION_OFFSETS_STRUCT.pack_into(newFile, layout["sectionOffsetsOffset"], layout["unknDataOffset"], layout["langOffset"], layout["attributeOffset"], layout["attributeNameOffset"])
+
+        # entries headers' offset
+        entryHeadSize = getEntryHeadStruct(langCount).size
+        entryHeadsOffset = layout["entryHeadsOffset"]
+        getArrayStruct("Q", entryCount).pack_into(newFile, layout["entryOffsetsOffset"], *range(entryHeadsOffset, entryHeadsOffset + entryCount * entryHeadSize, entryHeadSize))
+        # unknData is always 0, and so as the paddings
 
+        getArrayStruct("i", langCount).pack_into(newFile, layout["langOffset"], *self.languages)  # languages
+        getArrayStruct("i", attributeCount).pack_into(newFile, layout["attributeOffset"], *list([head["valueType"] for head in self.attributeHeaders]))  # attributeHeaders.valueType
+        getArrayStruct("Q", attributeCount).pack_into(newFile, layout["attributeNameOffset"], *list([strOffsetDict[head["name"]] for head in self.attributeHeaders]))
+
+    def packPool(self, newFile: bytearray, dataOffset: int, rawPool: bytes, wcharPool: bytes) -> memoryview:
+        """fill the string pool into newFile, strings from the source pool are copied as is, and the new strings continue the cipher chain after them"""
+
+        view = memoryview(newFile)
+        poolEnd = dataOffset + len(rawPool)
+        view[dataOffset:poolEnd] = rawPool
         if isVersionEncrypt(self.version):
-            newFile.extend(helper.encrypt(wcharPool))
+            helper.blockEncryptInto(wcharPool, view[poolEnd:], len(rawPool), rawPool[-1] if len(rawPool) > 0 else 0)
         else:
-            newFile.extend(wcharPool)
-
-        # update string offsets
-        for i, a in enumerate(self.attributeHeaders):
-            newFile[attributeNamesOffsetsPH[i] : attributeNamesOffsetsPH[i] + 8] = struct.pack("<Q", strOffsetDict[a["name"]] + dataOffset)
-        for entry in self.entrys:
-            newFile[entry.entryNameOffsetPH : entry.entryNameOffsetPH + 8] = struct.pack("<Q", strOffsetDict[entry.name] + dataOffset)
-            for i, lang in enumerate(self.languages):
-                newFile[entry.contentOffsetsByLangsPH[i] : entry.contentOffsetsByLangsPH[i] + 8] = struct.pack("<Q", strOffsetDict[entry.langs[i]] + dataOffset)
-            for idx in isStrAttrIdx:
-                newFile[entry.attributesPH[idx] : entry.attributesPH[idx] + 8] = struct.pack("<Q", strOffsetDict[entry.attributes[idx]] + dataOffset)
-            for idx in isNullAttrIdx:
-                newFile[entry.attributesPH[idx] : entry.attributesPH[idx] + 8] = struct.pack("<Q", strOffsetDict[""] + dataOffset)
+            view[poolEnd:] = wcharPool
 
         # printHexView(newFile)
 
-        return bytes(newFile)
+        return view
+
+
+class MSGOverlay(MSG):
+    """copy-on-write view of a MSG object, entries are shared with the base MSG until they are edited.
+
+    shared entries are read-only SharedEntry views, edit them through editEntry() so the base MSG object is never modified."""
+
+    def __init__(self, base: MSG):
+        super().__init__()
+        self.base = base
+        self.version = base.version
+        self.languages = list(base.languages)
+        self.attributeHeaders = list([dict(head) for head in base.attributeHeaders])
+        self.hasDI = base.hasDI
+        self.sourcePool = base.sourcePool
+        self.entrys = list([SharedEntry(entry.entry if isinstance(entry, SharedEntry) else entry) for entry in base.entrys])
+
+    def editEntry(self, index: int) -> Entry:
+        """the entry at index, copied from the base MSG at the first edit"""
+        entry = self.entrys[index]
+        if isinstance(entry, SharedEntry):
+            entry = entry.copy()
+            self.entrys[index] = entry
+        return entry
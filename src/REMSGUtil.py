@@ -1,14 +1,20 @@
-import copy
+import array
+import codecs
+import contextlib
 import csv
+import functools
 import io
+import itertools
 import json
+import marshal
+import mmap
 import os
 import uuid
 import re
+import sys
 import logging
-from typing import Final, Iterator
+from typing import Final, Iterator, NamedTuple
 
-import chardet
 import mmh3
 import REMSG
 import REWString as helper
@@ -54,52 +60,158 @@ SHORT_LANG_LU: Final[dict[str, int]] = {
 DI_WARNING: Final[str] = "\nPlease use an editor like VS Code to visualize and edit the output text carefully,\n to avoid issues during import/export with other format."
 
 
-def printDIWarning(msg: REMSG.MSG, langIndex=None, detectAttrHead=True, detectEntryName=True, detectAttr=True) -> None:
-    """print warning if there is any non-printable character in the msg"""
+DI_SCAN_CHUNK_SIZE: Final[int] = 4096
+"""number of strings joined for one regex pass of scanDI"""
 
-    if detectAttrHead:
-        for i, attrHead in enumerate(msg.attributeHeaders):
-            if helper.isDI(attrHead["name"]):
-                logging.warning(f"Non-printable character in attributeName[{i}]={helper.escapeDI(attrHead['name'])}." + DI_WARNING)
 
-    for index, entry in enumerate(msg.entrys):
-        if detectEntryName:
-            if helper.isDI(entry.name):
-                logging.warning(f"Non-printable character in entryName[{index}]={helper.escapeDI(entry.name)}." + DI_WARNING)
+class DIReport(NamedTuple):
+    """a string with Default Ignorable Code Points in a msg"""
 
-        if langIndex is not None:
-            if helper.isDI(entry.langs[langIndex]):
-                logging.warning(f"Non-printable character in entry {entry.name}[{REMSG.LANG_LIST[langIndex]}]={helper.escapeDI(entry.langs[langIndex])}." + DI_WARNING)
-        else:
-            for i, lang in enumerate(entry.langs):
-                if helper.isDI(lang):
-                    logging.warning(f"Non-printable character in entry {entry.name}[{REMSG.LANG_LIST[i]}]={(helper.escapeDI(lang))}." + DI_WARNING)
+    field: str
+    """attributeName / entryName / content / attribute"""
+    entryIndex: int | None
+    """None for attributeName"""
+    index: int | None
+    """lang index for content, attribute index for attributeName / attribute"""
+    text: str
+    positions: list[int]
 
-        if detectAttr:
-            for attr, attrHead in zip(entry.attributes, msg.attributeHeaders):
-                if helper.isDI(str(attr)):
-                    logging.warning(f"Non-printable character in entry {entry.name} attribute[{attrHead['name']}]={helper.escapeDI(str(attr))}." + DI_WARNING)
 
+def scanDI(msg: REMSG.MSG, langIndex=None, detectAttrHead=True, detectEntryName=True, detectAttr=True) -> list[DIReport]:
+    """find all Default Ignorable Code Points in the msg in one pass
 
-def searchSameGuid(msg: REMSG.MSG) -> Iterator[str]:
-    """research use, return all entry name with same guid in one file"""
-    guidset = set()
+    @param langIndex: lang index or list of lang indexes to check, None for all languages.
+    """
+
+    attrHeadNames = list([attrHead["name"] for attrHead in msg.attributeHeaders]) if detectAttrHead else list()
+    if langIndex is None:
+        langIndexes = list(range(len(msg.languages)))
+    elif isinstance(langIndex, int):
+        langIndexes = [langIndex]
+    else:
+        langIndexes = list(langIndex)
+    # int / double attributes never have DI when turned into str
+    strAttrIndexes = list([i for i, attrHead in enumerate(msg.attributeHeaders) if attrHead["valueType"] in (-1, 2)]) if detectAttr else list()
+
+    # texts of each entry: [name] + langs + string attributes
+    nameCount = 1 if detectEntryName else 0
+    textsPerEntry = nameCount + len(langIndexes) + len(strAttrIndexes)
+    report: list[DIReport] = list()
+
+    def scanChunk(texts: list[str], firstTextIndex: int):
+        for chunkIndex, positions in helper.scanDI(texts).items():
+            textIndex = firstTextIndex + chunkIndex
+            if textIndex < len(attrHeadNames):
+                report.append(DIReport("attributeName", None, textIndex, texts[chunkIndex], positions))
+                continue
+            entryIndex, offset = divmod(textIndex - len(attrHeadNames), textsPerEntry)
+            if offset < nameCount:
+                report.append(DIReport("entryName", entryIndex, None, texts[chunkIndex], positions))
+            elif offset < nameCount + len(langIndexes):
+                report.append(DIReport("content", entryIndex, langIndexes[offset - nameCount], texts[chunkIndex], positions))
+            else:
+                report.append(DIReport("attribute", entryIndex, strAttrIndexes[offset - nameCount - len(langIndexes)], texts[chunkIndex], positions))
+
+    # scan in chunks, so memory of the joined text stays bounded for huge msg
+    texts = list(attrHeadNames)
+    firstTextIndex = 0
     for entry in msg.entrys:
-        if entry.guid not in guidset:
-            guidset.add(entry.guid)
+        if detectEntryName:
+            texts.append(entry.name)
+        if langIndex is None:
+            texts.extend(entry.langs)
         else:
-            yield str(entry.guid) + ":" + entry.name
+            langs = entry.langs
+            texts.extend([langs[i] for i in langIndexes])
+        if len(strAttrIndexes) > 0:
+            attributes = entry.attributes
+            texts.extend([str(attributes[i]) for i in strAttrIndexes])
+        if len(texts) >= DI_SCAN_CHUNK_SIZE:
+            scanChunk(texts, firstTextIndex)
+            firstTextIndex += len(texts)
+            texts = list()
+    scanChunk(texts, firstTextIndex)
+    return report
+
+
+def printDIWarning(msg: REMSG.MSG, langIndex=None, detectAttrHead=True, detectEntryName=True, detectAttr=True) -> list[DIReport]:
+    """print warning if there is any non-printable character in the msg, return the DIReport of them"""
+
+    report = scanDI(msg, langIndex, detectAttrHead, detectEntryName, detectAttr)
+    for item in report:
+        escaped = helper.escapeDI(item.text, item.positions)
+        match item.field:
+            case "attributeName":
+                logging.warning(f"Non-printable character in attributeName[{item.index}]={escaped}." + DI_WARNING)
+            case "entryName":
+                logging.warning(f"Non-printable character in entryName[{item.entryIndex}]={escaped}." + DI_WARNING)
+            case "content":
+                logging.warning(f"Non-printable character in entry {msg.entrys[item.entryIndex].name}[{REMSG.LANG_LIST[item.index]}]={escaped}." + DI_WARNING)
+            case "attribute":
+                logging.warning(f"Non-printable character in entry {msg.entrys[item.entryIndex].name} attribute[{msg.attributeHeaders[item.index]['name']}]={escaped}." + DI_WARNING)
+    msg.hasDI = len(report) > 0
+    return report
+
+
+def searchSameGuid(msg: REMSG.MSG) -> Iterator[str]:
+    """research use, return all entry name with same guid in one file"""
+    table = REMSG.EntryTable(msg.version, len(msg.languages))
+    table.fillFromEntrys(msg.entrys)
+    for index in table.duplicateGuids():
+        entry = msg.entrys[index]
+        yield REMSG.guidToStr(entry.rawGuid) + ":" + entry.name
 
 
 def searchGuid(msg: REMSG.MSG, guid: uuid.UUID) -> Iterator[str]:
     """research use, return all entry name with that guid"""
+    rawGuid = guid.bytes_le
     for entry in msg.entrys:
-        if entry.guid.hex == guid.hex:
-            yield str(entry.guid) + ":" + entry.name
+        if entry.rawGuid == rawGuid:
+            yield REMSG.guidToStr(entry.rawGuid) + ":" + entry.name
+
+BOM_ENCODINGS: Final[tuple[tuple[bytes, str], ...]] = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF32_LE, "utf-32"),  # before utf-16, as they share the first 2 bytes
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+"""BOM and the encoding to read that file"""
+
 
 def getEncoding(filename: str, bufferSize: int = 256 * 1024) -> str:
-    """althoguh I set utf-8 to all output file, but in-case someone copy paste to another file and has diff encoding..."""
-    rawdata = open(filename, "rb").read(bufferSize)
+    """althoguh I set utf-8 to all output file, but in-case someone copy paste to another file and has diff encoding...
+
+    check BOM first, then strict utf-8, only guess by chardet when both failed. cached by (path, mtime, size)."""
+    stat = os.stat(filename)
+    return detectEncoding(os.path.abspath(filename), stat.st_mtime_ns, stat.st_size, bufferSize)
+
+
+@functools.lru_cache(maxsize=4096)
+def detectEncoding(path: str, mtime: int, size: int, bufferSize: int) -> str:
+    """encoding of the first bufferSize bytes of file, mtime / size are only part of the cache key"""
+    with io.open(path, "rb") as f:
+        rawdata = f.read(bufferSize)
+
+    for bom, encode in BOM_ENCODINGS:
+        if rawdata.startswith(bom):
+            return encode
+
+    # utf-16 / utf-32 without BOM could still be valid utf-8, but text files never contain null
+    if b"\x00" not in rawdata:
+        try:
+            # final=False, as a multibyte char could be cut at the end of the buffer
+            codecs.getincrementaldecoder("utf-8")("strict").decode(rawdata, final=len(rawdata) < bufferSize)
+            return "utf-8-sig"  # also read utf-8 files without BOM
+        except UnicodeDecodeError:
+            pass
+
+    return chardetEncoding(rawdata)
+
+
+def chardetEncoding(rawdata: bytes) -> str:
+    """guess encoding by chardet"""
+    import chardet  # slow to import, and not needed for utf files
 
     CONFIDENCE_MUST_BE = 0.95
     CONFIDENCE_MOST_LIKELY = 0.75
@@ -123,7 +235,6 @@ def getEncoding(filename: str, bufferSize: int = 256 * 1024) -> str:
         encode = "utf-8"
     if encode.lower() == "utf-8":
         encode = "utf-8-sig"
-    # print(f"Detected Encoding: {encode.lower()} File: {filename}")
     return encode
 
 
@@ -176,12 +287,105 @@ def searchEntryName(msg: REMSG.MSG, filename: str, keyword: str) -> Iterator[str
             yield filename + "||" + entry.name
 
 
-def exportCSV(msg: REMSG.MSG, filename: str) -> None:
-    """write csv file from REMSG.MSG object"""
+class ChangedOnlyWriter(io.RawIOBase):
+    """binary file writer which leaves the file untouched if the new content is the same.
+
+    written bytes are compared with the existing file, a temp file is only written after the first difference,
+    and replaces the file at close."""
+
+    def __init__(self, filename: str):
+        super().__init__()
+        self.filename = filename
+        self.tempname = filename + ".tmp"
+        self.old = io.open(filename, "rb") if os.path.isfile(filename) else None
+        self.new = None
+        self.size = 0
+        """bytes written so far"""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("write to closed file")
+        data = memoryview(data).cast("B")
+        if self.new is None:
+            if self.old is not None and self.old.read(len(data)) == data:
+                self.size += len(data)
+                return len(data)
+            self.diverge()
+        self.new.write(data)
+        self.size += len(data)
+        return len(data)
+
+    def diverge(self) -> None:
+        """start writing the temp file, with the same part copied from the existing file"""
+        self.new = io.open(self.tempname, "wb")
+        if self.old is not None:
+            self.old.seek(0)
+            remaining = self.size
+            while remaining > 0:
+                chunk = self.old.read(min(remaining, 1 << 20))
+                self.new.write(chunk)
+                remaining -= len(chunk)
+            self.old.close()
+            self.old = None
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self.new is None and (self.old is None or len(self.old.read(1)) > 0):
+                self.diverge()  # no existing file, or it is longer
+            if self.old is not None:
+                self.old.close()
+            if self.new is not None:
+                self.new.close()
+                os.replace(self.tempname, self.filename)
+        finally:
+            super().close()
+
+    def discard(self) -> None:
+        """close without touching the file"""
+        if self.old is not None:
+            self.old.close()
+        if self.new is not None:
+            self.new.close()
+            os.remove(self.tempname)
+        super().close()
+
+
+@contextlib.contextmanager
+def openOutput(filename: str, mode: str = "w", encoding: str | None = None, newline: str | None = None) -> Iterator[io.IOBase]:
+    """io.open for writing, but the file is not rewritten if the content would be the same.
+    (keeps its mtime for other tools, and the old file is kept if writing fails)
+
+    @param mode: "w" for text, "wb" for binary.
+    """
 
-    printDIWarning(msg)
+    assert mode in ("w", "wb"), "only w and wb mode are supported"
+    raw = ChangedOnlyWriter(filename)
+    stream = io.BufferedWriter(raw)
+    if mode == "w":
+        stream = io.TextIOWrapper(stream, encoding=encoding, newline=newline)
+    try:
+        yield stream
+    except BaseException:
+        raw.discard()
+        raise
+    stream.close()
+
+
+def exportCSV(msg: REMSG.MSG, filename: str, diReport: list[DIReport] | None = None) -> None:
+    """write csv file from REMSG.MSG object
+
+    @param diReport: result of printDIWarning(msg) already done for this msg, to not scan it again.
+    """
+
+    if diReport is None:
+        printDIWarning(msg)
     # newline = \n, as the original string has \r\n already, set newline as \r\n will replace \r\n to \r\r\n
-    with io.open(filename, "w", encoding="utf-8-sig", newline="\n") as csvf:
+    with openOutput(filename, "w", encoding="utf-8-sig", newline="\n") as csvf:
         writer = csv.writer(csvf, delimiter=",")
         writer.writerow(
             ["guid", "crc?"]
@@ -191,17 +395,17 @@ def exportCSV(msg: REMSG.MSG, filename: str) -> None:
         )
         for entry in msg.entrys:
             writer.writerow(
-                [str(x) for x in (entry.guid, entry.crc)]
+                [REMSG.guidToStr(entry.rawGuid), str(entry.crc)]
                 + [str(x) for x in entry.attributes]
                 + [entry.name,]
-                + entry.langs
+                + list(entry.langs)
             )
 
 
 def importCSV(msgObj: REMSG.MSG, filename: str, version: int = None, langCount: int = None) -> REMSG.MSG:
     """read csv file, modify the provided msg object, and return the new REMSG.MSG object"""
 
-    msg = copy.deepcopy(msgObj)
+    msg = REMSG.MSGOverlay(msgObj) if msgObj is not None else None  # entries are all rebuilt from csv
     if version is None:
         if msg is not None:
             version = msg.version
@@ -212,78 +416,60 @@ def importCSV(msgObj: REMSG.MSG, filename: str, version: int = None, langCount:
         else:
             langCount = REMSG.VERSION_2_LANG_COUNT[version]
 
+    isEntryByHash = REMSG.isVersionEntryByHash(version)
+    newEntrys: list[REMSG.Entry] = list()
+    fGuidSet: set[bytes] = set()
     with io.open(filename, "r", encoding=getEncoding(filename), newline="\n") as csvf:
-        rows = list(csv.reader(csvf))
-        # for row in rows:
-        #     print(row)
-        guididx = rows[0].index("guid")
-        crcidx = rows[0].index("crc?")
-        nameidx = rows[0].index("entry name")
-        attridxs = list([i for i, field in enumerate(rows[0]) if field.startswith("<") and field.endswith(">")])
-        fAttrList = list([rows[0][idx].removeprefix("<").removesuffix(">") for idx in attridxs])
-        # fAttrNum = len(fAttrList)
-        fEntrys = list([row for row in rows[1:]])
-        # print(fAttrNum)
-        # print(len(fEntrys))
-
-    assert sorted(fAttrList) == sorted(list([head["name"] for head in msg.attributeHeaders])), "AttributeList Should be same as original"
-
-    missingEntry = list([str(entry.guid) for entry in msg.entrys if str(entry.guid) not in [fEntry[guididx] for fEntry in fEntrys]])
+        reader = csv.reader(csvf)
+        fields = next(reader)
+        guididx = fields.index("guid")
+        crcidx = fields.index("crc?")
+        nameidx = fields.index("entry name")
+        attridxs = list([i for i, field in enumerate(fields) if field.startswith("<") and field.endswith(">")])
+        fAttrList = list([fields[idx].removeprefix("<").removesuffix(">") for idx in attridxs])
+        assert sorted(fAttrList) == sorted(list([head["name"] for head in msg.attributeHeaders])), "AttributeList Should be same as original"
+        attrReaders = list(zip(attridxs, [header["valueType"] for header in msg.attributeHeaders]))
+        contentidx = len(fAttrList) + 3
+
+        # build entries row by row
+        for i, fEntry in enumerate(reader):
+            entry = REMSG.Entry(version)  # create a new one.
+            contents = fEntry[contentidx:]
+            assert len(contents) == langCount, f"Invalid number of language / contents.\n{"\n".join(contents)}"
+            entry.buildEntry(
+                guid=REMSG.strToGuid(fEntry[guididx]),
+                crc=int(fEntry[crcidx]),
+                name=fEntry[nameidx],
+                attributeValues=list([readAttributeFromStr(fEntry[idx], valueType) for idx, valueType in attrReaders]),
+                langs=[helper.forceWindowsLineBreak(content) for content in contents],
+                hash=REMSG.hashName(fEntry[nameidx]) if isEntryByHash else None,
+                index=i if not isEntryByHash else None,
+            )
+            fGuidSet.add(entry.rawGuid)
+            newEntrys.append(entry)
+
+    # not gonna check crc / name / hash of existing entries, left it to user
+    missingEntry = list([REMSG.guidToStr(entry.rawGuid) for entry in msg.entrys if entry.rawGuid not in fGuidSet])
     if len(missingEntry) > 0:
         print("Missing Entry:")
         print("\n".join(missingEntry))
         raise ValueError("Missing Entry")
 
-    # oldEntrys = dict([(entry.guid, entry) for entry in msg.entrys])
-    newEntrys: list[REMSG.Entry] = list()
-    for i, fEntry in enumerate(fEntrys):
-        entry = REMSG.Entry(version)  # create a new one.
-        attributes = list()
-        for ai, header in enumerate(msg.attributeHeaders):
-            value = readAttributeFromStr(fEntry[attridxs[ai]], header["valueType"])
-            attributes.append(value)
-
-        contents = fEntry[(len(fAttrList)+3):]
-        assert len(contents) == langCount, f"Invalid number of language / contents.\n{"\n".join(contents)}"
-        entry.buildEntry(
-            guid=fEntry[guididx],
-            crc=int(fEntry[crcidx]),
-            name=fEntry[nameidx],
-            attributeValues=attributes,
-            langs=[helper.forceWindowsLineBreak(content) for content in contents],
-            hash=mmh3.hash(key=fEntry[nameidx].encode("utf-16-le"), seed=0xFFFFFFFF, signed=False) if REMSG.isVersionEntryByHash(version) else None,
-            index=i if not (REMSG.isVersionEntryByHash(version)) else None,
-        )
-
-        # not gonna check, left it to user
-        # if entry.guid in oldEntrys.keys():
-        #     assert entry.crc == oldEntrys[entry.guid].crc
-        #     assert entry.name == oldEntrys[entry.guid].name
-        #     if isVersionEntryByHash(version):
-        #         assert entry.hash == oldEntrys[entry.guid].hash
-        #     else:
-        #         assert entry.index == entry.index
-        # else:
-        #     if isVersionEntryByHash(version):
-        #         if entry.hash != mmh3.hash(key = entry.name.encode('utf-16-le'), seed = 0xFFFFFFFF, signed = False):
-        #             print(f"Incorrect hash value for {entry.name}, filling a correct one")
-        #             entry.hash = mmh3.hash(key = entry.name.encode('utf-16-le'), seed = 0xFFFFFFFF, signed = False)
-        #     else:
-        #         assert entry.index >= len(oldEntrys)
-
-        newEntrys.append(entry)
-
     msg.entrys = newEntrys
 
     printDIWarning(msg, detectAttrHead=False)
     return msg
 
 
-def exportTXT(msg: REMSG.MSG, filename: str, langIndex: int, encode: str=None, withEntryName: bool=False) -> None:
-    """write txt file from REMSG.MSG object with specified language"""
+def exportTXT(msg: REMSG.MSG, filename: str, langIndex: int, encode: str=None, withEntryName: bool=False, diReport: list[DIReport] | None = None) -> None:
+    """write txt file from REMSG.MSG object with specified language
+
+    @param diReport: result of printDIWarning(msg) already done for this msg, to not scan it again.
+    """
 
-    printDIWarning(msg, langIndex=langIndex,  detectAttrHead=False, detectEntryName=withEntryName, detectAttr=False)
-    with io.open(filename, "w", encoding=encode if encode is not None else "utf-8") as txtf:
+    if diReport is None:
+        printDIWarning(msg, langIndex=langIndex,  detectAttrHead=False, detectEntryName=withEntryName, detectAttr=False)
+    with openOutput(filename, "w", encoding=encode if encode is not None else "utf-8") as txtf:
         txtf.writelines([f"<string{'' if not withEntryName else "="+entry.name}>" + entry.langs[langIndex].replace("\r\n", "<lf>") + "\n" for entry in msg.entrys])
 
 
@@ -293,36 +479,87 @@ def importTXT(msgObj: REMSG.MSG, filename: str, langIndex: int, encode: str=None
         encode = getEncoding(filename)
     elif "utf" in encode and "sig" not in encode:
         testEncode = getEncoding(filename)
-        if testEncode.endswith("sig"):
+        if testEncode.lower().endswith("sig"):
             encode = testEncode
 
-    msg = copy.deepcopy(msgObj)
+    msg = REMSG.MSGOverlay(msgObj)
     lines = None
     with io.open(filename, mode="r", encoding=encode) as txtf:
         lines = list([re.sub(r'^<string(?:=[^>]*)?>', '', s.rstrip("\n").rstrip("\r").replace("<lf>", "\r\n"))
             for s in txtf if s.startswith("<string")])
 
     assert len(lines) == len(msg.entrys), "Invalid number of entry"
+    # only the entries with changed content get copied from msgObj
     for i, entry in enumerate(msg.entrys):
-        entry.langs[langIndex] = lines[i]
+        if entry.langs[langIndex] != lines[i]:
+            msg.editEntry(i).langs[langIndex] = lines[i]
 
     printDIWarning(msg, langIndex=langIndex, detectAttrHead=False, detectEntryName=False, detectAttr=False)
     return msg
 
 
-def exportMHRTextDump(msg: REMSG.MSG, filename: str, withEntryName: bool=False) -> None:
-    """export all the content with all the language seperate by folders."""
+def getMHRTextDumpFiles(filename: str) -> dict[int, str]:
+    """return {lang : output txt path} of exportMHRTextDump, each language in its own folder"""
 
     folder, file = os.path.split(filename)
-    for lang in REMSG.MHR_SUPPORTED_LANG:
-        if not os.path.exists(os.path.join(folder, REMSG.LANG_LIST.get(lang, f"lang_{lang}"))):
-            try:
-                os.makedirs(os.path.join(folder, REMSG.LANG_LIST.get(lang, f"lang_{lang}")))
-            except Exception as e:
-                print(e)
+    return {lang: os.path.join(folder, REMSG.LANG_LIST.get(lang, f"lang_{lang}"), file) for lang in REMSG.MHR_SUPPORTED_LANG}
 
-        outputPath = os.path.join(folder, REMSG.LANG_LIST.get(lang, f"lang_{lang}"), file)
-        exportTXT(msg, outputPath, lang, "utf-8-sig", withEntryName)
+
+DUMP_BLOCK_ENTRIES: Final[int] = 4096
+"""number of entries written at once by exportMHRTextDump"""
+
+
+@functools.lru_cache(maxsize=None)
+def makeDirs(folder: str) -> None:
+    """os.makedirs, only once for each folder in this process, call makeDirs.cache_clear() if a folder may have been removed since"""
+
+    os.makedirs(folder, exist_ok=True)
+
+
+def writeMHRTextDump(msg: REMSG.MSG, outputPaths: dict[int, str], withEntryName: bool) -> None:
+    """write the txt files of exportMHRTextDump in one pass over the entries, one file handle per language
+
+    @param outputPaths: {lang : output txt path} from getMHRTextDumpFiles.
+    """
+
+    langIndexes = list(outputPaths)
+    with contextlib.ExitStack() as stack:
+        txtfs = list()
+        for outputPath in outputPaths.values():
+            makeDirs(os.path.dirname(outputPath))
+            txtfs.append(stack.enter_context(openOutput(outputPath, "w", encoding="utf-8-sig")))
+        # lines of each language are joined and written in blocks of entries, memory stays bounded
+        # and the (python level) utf-8-sig encoder runs once per block instead of once per line
+        blocks = list([list() for _ in txtfs])
+        for entryIndex, entry in enumerate(msg.entrys, 1):
+            head = f"<string={entry.name}>" if withEntryName else "<string>"
+            langs = entry.langs
+            for lines, langIndex in zip(blocks, langIndexes):
+                lines.append(head + langs[langIndex].replace("\r\n", "<lf>") + "\n")
+            if entryIndex % DUMP_BLOCK_ENTRIES == 0:
+                for txtf, lines in zip(txtfs, blocks):
+                    txtf.write("".join(lines))
+                    lines.clear()
+        for txtf, lines in zip(txtfs, blocks):
+            txtf.write("".join(lines))
+
+
+def exportMHRTextDump(msg: REMSG.MSG, filename: str, withEntryName: bool=False, diReport: list[DIReport] | None = None) -> None:
+    """export all the content with all the language seperate by folders.
+
+    @param diReport: result of printDIWarning(msg) already done for this msg, to not scan it again.
+    """
+
+    outputPaths = getMHRTextDumpFiles(filename)
+    if diReport is None:
+        printDIWarning(msg, langIndex=list(outputPaths), detectAttrHead=False, detectEntryName=withEntryName, detectAttr=False)
+
+    try:
+        writeMHRTextDump(msg, outputPaths, withEntryName)
+    except FileNotFoundError:
+        # a folder made before by this process was removed since, make them again
+        makeDirs.cache_clear()
+        writeMHRTextDump(msg, outputPaths, withEntryName)
 
 
 def valueTypeEnum(ty: int) -> str:
@@ -341,52 +578,163 @@ def valueTypeEnum(ty: int) -> str:
             return "Unknown"
 
 
-def buildmhriceJson(msg: REMSG.MSG) -> dict:
-    """build mhrice style json file from REMSG.MSG object.
+def buildmhriceJsonHeader(msg: REMSG.MSG) -> dict:
+    """build the fields before "entries" of mhrice style json from REMSG.MSG object."""
 
-    (with some additional info to let json itslef is able to convert to msg object)"""
-
-    infos = {
+    return {
         "version": msg.version,
         "languages": msg.languages,
         "attribute_headers": list([{"ty": attr["valueType"], "name": attr["name"]} for attr in msg.attributeHeaders]),
-        "entries": list(
-            [
-                {
-                    "name": entry.name,
-                    "guid": str(entry.guid),
-                    "crc?": entry.crc,
-                    "hash": entry.hash if REMSG.isVersionEntryByHash(msg.version) else 0xFFFFFFFF,
-                    "attributes": list([{valueTypeEnum(attrh["valueType"]): entry.attributes[i]} for i, attrh in enumerate(msg.attributeHeaders)]),
-                    "content": entry.langs,
-                }
-                for entry in msg.entrys
-            ]
-        ),
     }
 
+
+def buildmhriceJsonEntry(msg: REMSG.MSG, entry: REMSG.Entry) -> dict:
+    """build one item of "entries" of mhrice style json from an entry of REMSG.MSG object."""
+
+    return {
+        "name": entry.name,
+        "guid": REMSG.guidToStr(entry.rawGuid),
+        "crc?": entry.crc,
+        "hash": entry.hash if REMSG.isVersionEntryByHash(msg.version) else 0xFFFFFFFF,
+        "attributes": list([{valueTypeEnum(attrh["valueType"]): entry.attributes[i]} for i, attrh in enumerate(msg.attributeHeaders)]),
+        "content": list(entry.langs),
+    }
+
+
+def buildmhriceJson(msg: REMSG.MSG) -> dict:
+    """build mhrice style json file from REMSG.MSG object.
+
+    (with some additional info to let json itslef is able to convert to msg object)"""
+
+    infos = buildmhriceJsonHeader(msg)
+    infos["entries"] = list([buildmhriceJsonEntry(msg, entry) for entry in msg.entrys])
+
     return infos
 
 
-def exportJson(msg: REMSG.MSG, filename: str) -> None:
-    """write mhrice like json file from REMSG.MSG object."""
+def iterMhriceJson(msg: REMSG.MSG) -> Iterator[str]:
+    """yield mhrice style json text of REMSG.MSG object one entry at a time.
 
-    printDIWarning(msg)
-    with io.open(filename, "w", encoding="utf-8") as jsonf:
-        json.dump(buildmhriceJson(msg), jsonf, ensure_ascii=False, indent=2)
+    the joined text is the same as json.dump(buildmhriceJson(msg), ensure_ascii=False, indent=2)"""
 
+    encoder = json.JSONEncoder(ensure_ascii=False, indent=2)
+    yield encoder.encode(buildmhriceJsonHeader(msg)).removesuffix("\n}")
+    yield ',\n  "entries": ['
+    separator = "\n    "
+    for entry in msg.entrys:
+        # entries are 2 levels deep, json strings never contain a raw line break
+        yield separator + encoder.encode(buildmhriceJsonEntry(msg, entry)).replace("\n", "\n    ")
+        separator = ",\n    "
+    yield "]\n}" if separator == "\n    " else "\n  ]\n}"
 
-def importJson(msgObj: REMSG.MSG, filename: str) -> REMSG.MSG:
-    """read json file, and return the new REMSG.MSG object.
 
-    @param msgObj: deprecated parameter, you may pass None for this.
-    @param filename: filename string.
+def exportJson(msg: REMSG.MSG, filename: str, diReport: list[DIReport] | None = None) -> None:
+    """write mhrice like json file from REMSG.MSG object, one entry at a time.
+
+    @param diReport: result of printDIWarning(msg) already done for this msg, to not scan it again.
     """
 
-    msg = REMSG.MSG()
-    mhriceJson = ""
-    with io.open(filename, "r", encoding=getEncoding(filename)) as jsonf:
-        mhriceJson = json.load(jsonf)
+    if diReport is None:
+        printDIWarning(msg)
+    with openOutput(filename, "w", encoding="utf-8") as jsonf:
+        jsonf.writelines(iterMhriceJson(msg))
+
+
+JSON_CHUNK_SIZE: Final[int] = 1 << 16
+"""number of chars read at once by JsonStreamReader"""
+
+_JSON_WHITESPACE: Final = re.compile(r"[ \t\n\r]*")
+_JSON_NUMBER_TAIL: Final = re.compile(r"[0-9.eE+\-]*\Z")
+"""rest of the buffer that may still be part of a number"""
+
+
+class JsonStreamReader:
+    """read json values from a text stream chunk by chunk, only the unread part of the current chunk is kept"""
+
+    __slots__ = ("stream", "decoder", "buffer", "pos", "eof")
+
+    def __init__(self, stream: io.TextIOBase):
+        self.stream = stream
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """read next chunk after the unread part, return False at end of file"""
+        if self.eof:
+            return False
+        chunk = self.stream.read(JSON_CHUNK_SIZE)
+        self.eof = len(chunk) == 0
+        self.buffer = self.buffer[self.pos :] + chunk
+        self.pos = 0
+        return not self.eof
+
+    def peek(self) -> str:
+        """skip whitespace, return the next char, or "" at end of file"""
+        while True:
+            self.pos = _JSON_WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos : self.pos + 1]
+
+    def expect(self, chars: str) -> str:
+        """consume and return the next char, which should be one of chars"""
+        char = self.peek()
+        if char == "" or char not in chars:
+            raise json.JSONDecodeError(f"Expecting one of {chars!r}", self.buffer, self.pos)
+        self.pos += 1
+        return char
+
+    def decode(self):
+        """consume and return the next json value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue  # value continues in the next chunk
+                raise
+            # a number cut by the chunk end (e.g. "12." or "1.5e") is decoded without its tail, read more to be sure
+            if isinstance(value, (int, float)) and _JSON_NUMBER_TAIL.match(self.buffer, end) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def iterJsonItems(stream: io.TextIOBase, arrayKey: str) -> Iterator[tuple[str, object]]:
+    """read a json object incrementally, yield (key, value) of its top level items in file order.
+
+    the array under arrayKey is yielded one item at a time as (arrayKey, item)."""
+
+    reader = JsonStreamReader(stream)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.decode()
+        assert isinstance(key, str), "json object key should be string"
+        reader.expect(":")
+        if key == arrayKey and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield key, reader.decode()
+                    if reader.expect(",]") == "]":
+                        break
+        else:
+            yield key, reader.decode()
+        if reader.expect(",}") == "}":
+            return
+
+
+def readJsonHeader(msg: REMSG.MSG, mhriceJson: dict, firstEntry: dict | None) -> None:
+    """set version, languages and attributeHeaders of msg from mhrice json fields
+
+    @param firstEntry: first item of "entries", to count languages when "languages" is not in the json. None if no entries.
+    """
 
     msg.version = int(mhriceJson["version"])
     if mhriceJson.get("languages") is not None:
@@ -397,46 +745,319 @@ def importJson(msgObj: REMSG.MSG, filename: str) -> REMSG.MSG:
     else:
         if REMSG.isVersionIgnoreUnusedLang(msg.version):
             raise ValueError("mhrice json file does not contain language indexes, but the version is not support language indexes autogen.")
-        if len(mhriceJson["entries"]) > 0:
-            msg.languages = list(range(len(mhriceJson["entries"][0]["content"])))
+        if firstEntry is not None:
+            msg.languages = list(range(len(firstEntry["content"])))
         else:
             msg.languages = list(range(REMSG.VERSION_2_LANG_COUNT[msg.version]))
 
     # replace Attribute Head
     msg.attributeHeaders = list([{"valueType": head["ty"], "name": head["name"]} for head in mhriceJson["attribute_headers"]])
 
-    newEntrys: list[REMSG.Entry] = list()
-    for jIndex, jEntry in enumerate(mhriceJson["entries"]):
-        entry = REMSG.Entry(msg.version)  # create a new one.
-        entry.buildEntry(
-            guid=jEntry["guid"],
-            crc=jEntry["crc?"],
-            name=jEntry["name"],
-            attributeValues=list([readAttributeFromStr(next(iter(attr.values())), msg.attributeHeaders[i]["valueType"]) for i, attr in enumerate(jEntry["attributes"])]),
-            langs=list([helper.forceWindowsLineBreak(content) for content in jEntry["content"]]),
-            hash=mmh3.hash(key=jEntry["name"].encode("utf-16-le"), seed=0xFFFFFFFF, signed=False) if REMSG.isVersionEntryByHash(msg.version) else None,
-            index=jIndex if not (REMSG.isVersionEntryByHash(msg.version)) else None,
-        )
 
-        newEntrys.append(entry)
+def buildJsonEntry(msg: REMSG.MSG, jIndex: int, jEntry: dict) -> REMSG.Entry:
+    """build a new entry from an item of mhrice json "entries", msg header should be read already"""
 
-    msg.entrys = newEntrys
+    entry = REMSG.Entry(msg.version)
+    entry.buildEntry(
+        guid=jEntry["guid"],
+        crc=jEntry["crc?"],
+        name=jEntry["name"],
+        attributeValues=list([readAttributeFromStr(next(iter(attr.values())), msg.attributeHeaders[i]["valueType"]) for i, attr in enumerate(jEntry["attributes"])]),
+        langs=list([helper.forceWindowsLineBreak(content) for content in jEntry["content"]]),
+        hash=REMSG.hashName(jEntry["name"]) if REMSG.isVersionEntryByHash(msg.version) else None,
+        index=jIndex if not (REMSG.isVersionEntryByHash(msg.version)) else None,
+    )
+    return entry
+
+
+def iterJsonEntries(msg: REMSG.MSG, filename: str) -> Iterator[REMSG.Entry]:
+    """read mhrice json file incrementally, yield its entries one at a time.
+
+    version, languages and attributeHeaders of msg are set before the first entry is yielded.
+    (if they are after "entries" in the file, the whole file is loaded instead)
+
+    @param msg: REMSG.MSG object to receive the header, entrys of it are not touched.
+    @param filename: filename string.
+    """
+
+    with io.open(filename, "r", encoding=getEncoding(filename)) as jsonf:
+        mhriceJson = dict()
+        firstEntry = None
+        items = iterJsonItems(jsonf, "entries")
+        for key, value in items:
+            if key == "entries":
+                firstEntry = value
+                break
+            mhriceJson[key] = value
+
+        if firstEntry is not None and not all(key in mhriceJson for key in ("version", "languages", "attribute_headers")):
+            jsonf.seek(0)
+            mhriceJson = json.load(jsonf)
+            entries = iter(mhriceJson["entries"])
+            firstEntry = next(entries, None)
+        else:
+            entries = (value for key, value in items if key == "entries")
+
+        readJsonHeader(msg, mhriceJson, firstEntry)
+        if firstEntry is None:
+            return
+        for jIndex, jEntry in enumerate(itertools.chain([firstEntry], entries)):
+            yield buildJsonEntry(msg, jIndex, jEntry)
+
+
+def importJson(msgObj: REMSG.MSG, filename: str) -> REMSG.MSG:
+    """read json file, and return the new REMSG.MSG object.
+
+    @param msgObj: deprecated parameter, you may pass None for this. (only used to keep its source string pool)
+    @param filename: filename string.
+    """
+
+    msg = REMSG.MSG()
+    msg.entrys = list(iterJsonEntries(msg, filename))
+    if msgObj is not None and msgObj.version == msg.version:
+        msg.sourcePool = msgObj.sourcePool  # keep the string pool of the original msg file, if any
 
     printDIWarning(msg)
     return msg
 
 
-def importMSG(filename: str) -> REMSG.MSG:
-    """read a msg file and return a REMSG.MSG object"""
+@contextlib.contextmanager
+def mapFile(filename: str) -> Iterator[mmap.mmap | bytes]:
+    """map a file as a read only buffer, file content is not copied into memory until it is used"""
 
     with io.open(filename, "rb") as filestream:
-        msg = REMSG.MSG()
-        msg.readMSG(filestream)
-        return msg
+        try:
+            mapping = mmap.mmap(filestream.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file cannot be mapped
+            yield filestream.read()
+            return
+        try:
+            yield mapping
+        finally:
+            try:
+                mapping.close()
+            except BufferError:
+                # still viewed by a traceback, it will be unmapped once the view is freed
+                pass
+
+
+def hashCode(moduleNames: tuple[str, ...]) -> str:
+    """hash of the source files of the modules, changes with any change of their code.
+    a pyinstaller build has the code inside the executable, so the executable is hashed instead."""
+    if getattr(sys, "frozen", False):
+        files = [sys.executable]
+    else:
+        files = [sys.modules[name].__file__ for name in moduleNames]
+    hasher = mmh3.mmh3_x64_128(seed=0)
+    for file in files:
+        with mapFile(file) as buffer:
+            hasher.update(buffer)
+    return hasher.digest().hex()
+
+
+@functools.cache
+def getParseCacheVersion() -> str:
+    """hash of the code reading msg files and packing the parse cache, so any change of it invalidates all parse cache"""
+    return hashCode((__name__, "REMSG", "REWString", "HexTool"))
+
+
+PARSE_CACHE_SUFFIX: Final[str] = ".msgc"
+
+
+def getParseCachePath(cacheDir: str, filename: str) -> str:
+    """path of the parse cache blob of a msg file"""
+
+    return os.path.join(cacheDir, f"{mmh3.hash128(os.path.abspath(filename)):032x}{PARSE_CACHE_SUFFIX}")
+
 
+def dumpParseCache(msg: REMSG.MSG, filename: str, stat: os.stat_result, validation: str, cacheVersion: str | None = None) -> bytes:
+    """pack a fully read REMSG.MSG object into a marshal blob, keyed by path, size and mtime of its msg file and cacheVersion.
 
-def exportMSG(msg: REMSG.MSG, filename: str) -> None:
-    """write a msg file from a REMSG.MSG object"""
+    unique entry names and contents are joined into one pool text, entry heads and strings are stored as int columns.
+
+    @param cacheVersion: getParseCacheVersion, taken once by the caller. None to take it here.
+    """
+
+    entrys = msg.entrys
+    byHash = REMSG.isVersionEntryByHash(msg.version)
+    stringIndexes: dict[str, int] = dict()
+    nameIndexes = array.array("I", [stringIndexes.setdefault(entry.name, len(stringIndexes)) for entry in entrys])
+    langIndexes = array.array("I", [stringIndexes.setdefault(text, len(stringIndexes)) for entry in entrys for text in entry.langs])
+    return marshal.dumps(
+        (
+            cacheVersion if cacheVersion is not None else getParseCacheVersion(),
+            os.path.abspath(filename),
+            stat.st_size,
+            stat.st_mtime_ns,
+            validation,
+            msg.version,
+            list(msg.languages),
+            list([(attrHead["valueType"], attrHead["name"]) for attrHead in msg.attributeHeaders]),
+            "".join(stringIndexes),
+            array.array("I", map(len, stringIndexes)).tobytes(),
+            b"".join([entry.rawGuid for entry in entrys]),
+            array.array("I", [entry.crc for entry in entrys]).tobytes(),
+            array.array("I", [entry.hash if byHash else entry.index for entry in entrys]).tobytes(),
+            nameIndexes.tobytes(),
+            langIndexes.tobytes(),
+            list([list(entry.attributes) for entry in entrys]),
+        )
+    )
+
+
+def loadParseCache(cacheDir: str, filename: str, validation: str = REMSG.VALIDATION_FULL, cacheVersion: str | None = None) -> REMSG.MSG | None:
+    """read the cached REMSG.MSG object of a msg file, None if there is no cache for its current size and mtime
+
+    @param validation: the cache is only used if it was read with the same or a higher validation level.
+    @param cacheVersion: getParseCacheVersion, taken once by the caller. None to take it here.
+    """
+
+    cachePath = getParseCachePath(cacheDir, filename)
+    try:
+        stat = os.stat(filename)
+        with io.open(cachePath, "rb") as cachef:
+            blob = marshal.loads(cachef.read())
+        blobVersion, path, size, mtime, cachedValidation, version, languages, attributeHeaders, poolText, lengths, guids, crcs, hashOrIndexes, nameIndexes, langIndexes, attributes = blob
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if cacheVersion is None:
+        cacheVersion = getParseCacheVersion()
+    if (blobVersion, path, size, mtime) != (cacheVersion, os.path.abspath(filename), stat.st_size, stat.st_mtime_ns):
+        return None
+    if REMSG.VALIDATION_LEVELS.index(cachedValidation) < REMSG.VALIDATION_LEVELS.index(validation):
+        return None
+
+    ends = list(itertools.accumulate(array.array("I", lengths)))
+    strings = list([poolText[start:end] for start, end in zip(itertools.chain((0,), ends), ends)])
+    texts = list([strings[i] for i in array.array("I", langIndexes)])
+    names = list([strings[i] for i in array.array("I", nameIndexes)])
+    crcs = array.array("I", crcs)
+    hashOrIndexes = array.array("I", hashOrIndexes)
+
+    msg = REMSG.MSG()
+    msg.version = version
+    msg.languages = languages
+    msg.attributeHeaders = list([{"valueType": valueType, "name": name} for valueType, name in attributeHeaders])
+    byHash = REMSG.isVersionEntryByHash(version)
+    langCount = len(languages)
+    entrys: list[REMSG.Entry] = list()
+    for i, name in enumerate(names):
+        entry = REMSG.Entry(version)
+        entry.rawGuid = guids[i * 16 : i * 16 + 16]
+        entry.crc = crcs[i]
+        if byHash:
+            entry.hash = hashOrIndexes[i]
+        else:
+            entry.index = hashOrIndexes[i]
+        entry.name = name
+        entry.attributes = attributes[i]
+        entry.langs = texts[i * langCount : i * langCount + langCount]
+        entrys.append(entry)
+    msg.entrys = entrys
+
+    # mtime of the blob is its last use, for evictParseCache
+    with contextlib.suppress(OSError):
+        os.utime(cachePath)
+    return msg
+
+
+def saveParseCache(cacheDir: str, filename: str, msg: REMSG.MSG, stat: os.stat_result, validation: str = REMSG.VALIDATION_FULL, cacheVersion: str | None = None) -> None:
+    """write the parse cache blob of a msg file, see dumpParseCache
+
+    @param stat: os.stat of the msg file taken before reading it.
+    """
+
+    os.makedirs(cacheDir, exist_ok=True)
+    cachePath = getParseCachePath(cacheDir, filename)
+    # other processes may read the same blob, write to a temp file and replace
+    tempPath = f"{cachePath}.{os.getpid()}.tmp"
+    with io.open(tempPath, "wb") as cachef:
+        cachef.write(dumpParseCache(msg, filename, stat, validation, cacheVersion))
+    os.replace(tempPath, cachePath)
+
+
+def evictParseCache(cacheDir: str, maxBytes: int) -> tuple[int, int]:
+    """remove the least recently used parse cache blobs until they take at most maxBytes in total
+
+    @return: (number of removed blobs, bytes of the kept blobs)
+    """
+
+    blobs = list()
+    with contextlib.suppress(FileNotFoundError):
+        with os.scandir(cacheDir) as it:
+            for dirEntry in it:
+                if dirEntry.name.endswith(PARSE_CACHE_SUFFIX) and dirEntry.is_file():
+                    stat = dirEntry.stat()
+                    blobs.append((stat.st_mtime_ns, stat.st_size, dirEntry.path))
+
+    blobs.sort(reverse=True)
+    totalBytes = 0
+    removed = 0
+    for _, size, path in blobs:
+        if totalBytes + size <= maxBytes:
+            totalBytes += size
+            continue
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        removed += 1
+    return removed, totalBytes
+
+
+def importMSG(filename: str, lazy: bool = False, useMmap: bool = True, validation: str = REMSG.VALIDATION_FULL, keepSourcePool: bool = False, cacheDir: str | None = None, cacheVersion: str | None = None) -> REMSG.MSG:
+    """read a msg file and return a REMSG.MSG object
+
+    @param lazy: only decode strings when they are first read, for callers using a few languages / names only.
+    @param useMmap: parse the file from a memory map, instead of reading the whole file into memory first.
+    @param validation: one of REMSG.VALIDATION_LEVELS, use "none" / "structural" for trusted (unmodified game) files.
+    @param keepSourcePool: keep the string pool of the file, to write it back with exportMSG(incremental=True).
+    @param cacheDir: folder of parse cache, load the parsed msg from it instead of parsing the file again, see loadParseCache.
+        not used with keepSourcePool, the string pool as in file is not cached.
+    @param cacheVersion: getParseCacheVersion, taken once by the caller to not hash the code in every process. None to take it here.
+    """
+
+    useCache = cacheDir is not None and not keepSourcePool
+    if useCache:
+        msg = loadParseCache(cacheDir, filename, validation, cacheVersion)
+        if msg is not None:
+            return msg
+        # the cache keeps every string, so read it fully
+        lazy = False
+        stat = os.stat(filename)
+
+    msg = REMSG.MSG()
+    if useMmap:
+        with mapFile(filename) as buffer:
+            msg.readMSGFromBuffer(buffer, lazy, validation, keepSourcePool)
+    else:
+        with io.open(filename, "rb") as filestream:
+            msg.readMSG(filestream, lazy, validation, keepSourcePool)
+
+    if useCache:
+        try:
+            saveParseCache(cacheDir, filename, msg, stat, validation, cacheVersion)
+        except OSError as e:
+            logging.warning(f"failed to write parse cache of {filename}: {e}")
+    return msg
+
+
+def lookup(filename: str, nameOrGuid: str | uuid.UUID | bytes, langIndex: int) -> str | None:
+    """read one content of an entry by entry name or guid from a msg file, None if the entry is not found.
+
+    only the strings being read are decrypted, use it for point lookups instead of importMSG"""
+
+    with mapFile(filename) as buffer:
+        entry = REMSG.MSG().readEntry(buffer, nameOrGuid)
+        content = None if entry is None else entry.langs[langIndex]
+        del entry  # release the view on the mapping
+    return content
+
+
+def exportMSG(msg: REMSG.MSG, filename: str, incremental: bool = False) -> None:
+    """write a msg file from a REMSG.MSG object
+
+    @param incremental: keep the string pool of the source msg file, see REMSG.MSG.writeMSG
+    """
 
-    with io.open(filename, "wb") as outstream:
-        outstream.write(msg.writeMSG())
+    with openOutput(filename, "wb") as outstream:
+        outstream.write(msg.writeMSG(incremental))
@@ -1,7 +1,18 @@
+import bisect
+import itertools
+import operator
+import re
 from typing import Final
 
 KEY: Final[list[int]] = [0xCF, 0xCE, 0xFB, 0xF8, 0xEC, 0x0A, 0x33, 0x66, 0x93, 0xA9, 0x1D, 0x93, 0x50, 0x39, 0x5F, 0x09]
 
+BLOCK_SIZE: Final[int] = 0x10000
+"""bytes handled per step by the block cipher, must be a multiple of len(KEY)"""
+
+_KEY_BLOCK: Final[int] = int.from_bytes(bytes(KEY) * (BLOCK_SIZE // len(KEY) + 1), "little")
+"""one more KEY than BLOCK_SIZE, so it could be shifted to start at any KEY index"""
+_ONES_BLOCK: Final[int] = int.from_bytes(b"\x01" * BLOCK_SIZE, "little")
+
 
 def seekString(offset: int, stringDict: dict[int, str]) -> str:
     """seek string from string dict"""
@@ -46,21 +57,159 @@ def encrypt(rawBytes: bytes) -> bytes:
     return bytes(rawData)
 
 
+def prefixXor(value: int, size: int) -> int:
+    """xor scan over a little endian int of size bytes, byte i become byte 0 ^ ... ^ byte i"""
+    mask = (1 << (size * 8)) - 1
+    shift = 8
+    while shift < size * 8:
+        value = (value ^ (value << shift)) & mask
+        shift <<= 1
+    return value
+
+
+def blockDecrypt(rawBytes: bytes, start: int = 0, end: int | None = None) -> bytes:
+    """decrypt msg string part, same result as decrypt() but work on a whole block at once.
+
+    as the cipher only depends on the previous cipher byte, start / end could be used to decrypt rawBytes[start:end] only."""
+
+    end = len(rawBytes) if end is None else min(end, len(rawBytes))
+    result = bytearray(max(end - start, 0))
+    blockDecryptInto(rawBytes, result, start)
+    return bytes(result)
+
+
+def blockDecryptInto(rawBytes: bytes, result: bytearray | memoryview, start: int = 0):
+    """decrypt rawBytes[start:start + len(result)] into the preallocated result buffer.
+
+    each plain byte is cur ^ prev ^ key, so a block is just the cipher text xor itself shifted by one byte and the tiled key."""
+
+    end = start + len(result)
+    assert end <= len(rawBytes), f"decrypt range {start}-{end} out of {len(rawBytes)}"
+    key = _KEY_BLOCK >> (8 * (start % len(KEY)))
+    prev = rawBytes[start - 1] if start > 0 else 0
+    for blockStart in range(start, end, BLOCK_SIZE):
+        block = rawBytes[blockStart : min(blockStart + BLOCK_SIZE, end)]
+        blockSize = len(block)
+        mask = (1 << (blockSize * 8)) - 1
+        cur = int.from_bytes(block, "little")
+        plain = (cur ^ (cur << 8) ^ prev ^ key) & mask
+        result[blockStart - start : blockStart - start + blockSize] = plain.to_bytes(blockSize, "little")
+        prev = block[-1]
+
+
+def blockEncrypt(rawBytes: bytes) -> bytes:
+    """encrypt msg string part, same result as encrypt() but work on a whole block at once."""
+
+    result = bytearray(len(rawBytes))
+    blockEncryptInto(rawBytes, result)
+    return bytes(result)
+
+
+def blockEncryptInto(rawBytes: bytes, result: bytearray | memoryview, keyStart: int = 0, prev: int = 0):
+    """encrypt rawBytes into the preallocated result buffer.
+
+    each cipher byte is plain ^ key ^ previous cipher byte, which unrolls into a prefix xor of (plain ^ key),
+    then the last cipher byte of the previous block get xor into every byte of this block.
+
+    @param keyStart: offset of rawBytes in the whole string pool, to continue encrypting after an encrypted pool
+    @param prev: last cipher byte of the encrypted pool before rawBytes
+    """
+
+    size = len(rawBytes)
+    assert len(result) >= size, f"result buffer too small {len(result)} < {size}"
+    key = _KEY_BLOCK >> (8 * (keyStart % len(KEY)))
+    for start in range(0, size, BLOCK_SIZE):
+        block = rawBytes[start : start + BLOCK_SIZE]
+        blockSize = len(block)
+        mask = (1 << (blockSize * 8)) - 1
+        cipher = prefixXor(int.from_bytes(block, "little") ^ (key & mask), blockSize) ^ (prev * _ONES_BLOCK & mask)
+        result[start : start + blockSize] = cipher.to_bytes(blockSize, "little")
+        prev = result[start + blockSize - 1]
+
+
+def findWcharNull(wcharPool: bytes, start: int) -> int:
+    """find the offset of next null wchar (2 bytes aligned) from start"""
+    end = wcharPool.find(b"\x00\x00", start)
+    while end >= 0 and (end - start) % 2 != 0:
+        end = wcharPool.find(b"\x00\x00", end + 1)
+    return end
+
+
+class StringPool:
+    """wcharPool which only decode the string at an offset when it is first seeked"""
+
+    def __init__(self, wcharPool: bytes):
+        assert len(wcharPool) % 2 == 0, "wchar pool should have even size"
+        self.wcharPool = wcharPool
+        self.stringDict: dict[int, str] = dict()
+
+    def seek(self, offset: int) -> str:
+        """seek string at local offset, same as seekString() but decode on demand"""
+        string = self.stringDict.get(offset)
+        if string is None:
+            assert offset % 2 == 0 and 0 <= offset < len(self.wcharPool), f"seeking target not at string pool {offset}"
+            string = self.readString(offset)
+            self.stringDict[offset] = string
+        return string
+
+    def readString(self, offset: int) -> str:
+        """decode the string start at local offset"""
+        assert offset == 0 or self.wcharPool[offset - 2 : offset] == b"\x00\x00", f"seeking target not at string pool {offset}"
+        end = findWcharNull(self.wcharPool, offset)
+        assert end >= 0, "ending wchar not null"
+        return bytes(self.wcharPool[offset:end]).decode("utf-16-le")
+
+
+class ChunkedStringPool(StringPool):
+    """StringPool on a view of the wcharPool in file (e.g. a memoryview of a mmap), only the bytes of seeked strings get copied"""
+
+    CHUNK_SIZE: Final[int] = 256
+
+    def readChunk(self, start: int, end: int) -> bytes:
+        """wchar bytes from local offset start to end"""
+        return bytes(self.wcharPool[start:end])
+
+    def readString(self, offset: int) -> str:
+        """read chunk by chunk until the null wchar, and decode the string start at local offset"""
+        assert offset == 0 or self.readChunk(offset - 2, offset) == b"\x00\x00", f"seeking target not at string pool {offset}"
+        data = bytearray()
+        end = -1
+        while end < 0:
+            chunk = self.readChunk(offset + len(data), offset + len(data) + self.CHUNK_SIZE)
+            assert len(chunk) > 0, "ending wchar not null"
+            data.extend(chunk)
+            end = findWcharNull(data, max(len(data) - len(chunk) - 2, 0))
+        return data[:end].decode("utf-16-le")
+
+
+class EncryptedStringPool(ChunkedStringPool):
+    """StringPool on the encrypted wcharPool, only the bytes of seeked strings get decrypted"""
+
+    def readChunk(self, start: int, end: int) -> bytes:
+        return blockDecrypt(self.wcharPool, start, end)
+
+
 def wcharPool2StrDict(wcharPool: bytes) -> dict[int, str]:
-    """wcharPool to stringDict with {offset: content}"""
+    """wcharPool to stringDict with {offset: content}
+
+    offset is counted in bytes, a non-BMP char takes 2 wchars (surrogate pair) but only 1 char in python str."""
     if len(wcharPool) == 0:
         return dict()
 
     stringPool = wcharPool2StrPool(wcharPool)
+    hasSurrogatePair = len(stringPool) * 2 != len(wcharPool)
+    strings = stringPool.split("\x00")
+    strings.pop()  # nothing after the ending null
+    del stringPool
 
-    stringDict: dict[int, str] = dict()
-    start_pointer = 0
-    for i, wchar in enumerate(stringPool):
-        if wchar == "\x00":
-            stringDict[start_pointer * 2] = stringPool[start_pointer:i]  # local offset : value without \x00
-            start_pointer = i + 1  # update sp
-    # print(stringDict)
-    return stringDict
+    if hasSurrogatePair:
+        wcharCounts = (wcharSize(string) // 2 for string in strings)
+    else:
+        # each char is one wchar
+        wcharCounts = map(len, strings)
+    # offset = 2 * (wchars of all strings before + one null for each of them)
+    offsets = map(operator.mul, map(operator.add, itertools.accumulate(wcharCounts, initial=0), itertools.count()), itertools.repeat(2))
+    return dict(zip(offsets, strings))
 
 
 def wcharPool2StrPool(wcharPool: bytes) -> str:
@@ -76,18 +225,29 @@ def forceWindowsLineBreak(string: str) -> str:
     return string.replace("\r\n", "\n").replace("\r", "\n").replace("\n", "\r\n")
 
 
-def calcStrPoolOffsets(stringlist: list[str]) -> dict[str, int]:
-    """build a offset dict with {string : offset}"""
+def calcStrPoolOffsets(stringlist: list[str], start: int = 0, sort: bool = True) -> dict[str, int]:
+    """build a offset dict with {string : offset}
+
+    @param start: offset of the first string, when appending to an existing pool
+    @param sort: sort the strings, else keep the order of stringlist (which should not contain duplicates then)
+    """
     newDict = dict()
-    sizeCount = 0
-    for string in sorted(set(stringlist)):
+    sizeCount = start
+    for string in sorted(set(stringlist)) if sort else stringlist:
         # not adding null terminator here, it will done by toWcharBytes()
         newDict[string] = sizeCount
-        sizeCount = sizeCount + len(string) * 2 + 2
+        sizeCount = sizeCount + wcharSize(string) + 2
 
     return newDict
 
 
+def wcharSize(string: str) -> int:
+    """size in bytes of string in utf-16-le, without null terminator"""
+    if string.isascii():
+        return len(string) * 2
+    return len(string.encode("utf-16-le"))
+
+
 def toWcharBytes(string: str) -> bytes:
     """convert string to wchar(bytes) in utf-16-le with null terminator"""
     return (string + "\x00").encode("utf-16-le")
@@ -126,6 +286,21 @@ _DEFAULT_IGNORABLE_SET = frozenset(
 )
 
 
+def _toCharClass(codePoints: frozenset[int]) -> str:
+    """regex character class of code points, consecutive code points are merged into ranges"""
+    ranges: list[list[int]] = list()
+    for codePoint in sorted(codePoints):
+        if len(ranges) > 0 and ranges[-1][1] == codePoint - 1:
+            ranges[-1][1] = codePoint
+        else:
+            ranges.append([codePoint, codePoint])
+    return "[" + "".join(f"\\U{first:08x}" if first == last else f"\\U{first:08x}-\\U{last:08x}" for first, last in ranges) + "]"
+
+
+_DI_REGEX: Final[re.Pattern] = re.compile(_toCharClass(_DEFAULT_IGNORABLE_SET))
+"""match one Default Ignorable Code Point, built from _DEFAULT_IGNORABLE_SET"""
+
+
 def isCharDI(char: str) -> bool:
     """Check if character is Default Ignorable Code Point according to Unicode standard"""
     return ord(char) in _DEFAULT_IGNORABLE_SET
@@ -133,17 +308,42 @@ def isCharDI(char: str) -> bool:
 
 def isDI(text: str) -> bool:
     """Check if string has Default Ignorable Code Point according to Unicode standard"""
-    if len(text) == 0:
-        return False
-    return any(isCharDI(char) for char in text)
+    return _DI_REGEX.search(text) is not None
 
 
-def escapeDI(text: str) -> str:
-    """Escape Default Ignorable Code Points to Unicode escape sequences"""
-    result = []
-    for char in text:
-        if isCharDI(char):
-            result.append(f"\\u{ord(char):04x}")
-        else:
-            result.append(char)
+def findDI(text: str) -> list[int]:
+    """positions of Default Ignorable Code Points in text"""
+    return list([match.start() for match in _DI_REGEX.finditer(text)])
+
+
+def scanDI(texts: list[str]) -> dict[int, list[int]]:
+    """find Default Ignorable Code Points of many strings in one pass, return {index of text : positions in that text}"""
+    # "\n" is not DI, so matches never cross two texts
+    joined = "\n".join(texts)
+    first = _DI_REGEX.search(joined)
+    if first is None:
+        return dict()
+
+    starts = list(itertools.accumulate([len(text) + 1 for text in texts], initial=0))
+    result: dict[int, list[int]] = dict()
+    for match in _DI_REGEX.finditer(joined, first.start()):
+        index = bisect.bisect_right(starts, match.start()) - 1
+        result.setdefault(index, list()).append(match.start() - starts[index])
+    return result
+
+
+def escapeDI(text: str, positions: list[int] | None = None) -> str:
+    """Escape Default Ignorable Code Points to Unicode escape sequences
+
+    @param positions: positions of the Default Ignorable Code Points if already known (see findDI / scanDI)
+    """
+    if positions is None:
+        return _DI_REGEX.sub(lambda match: f"\\u{ord(match.group()):04x}", text)
+    result = list()
+    last = 0
+    for pos in positions:
+        result.append(text[last:pos])
+        result.append(f"\\u{ord(text[pos]):04x}")
+        last = pos + 1
+    result.append(text[last:])
     return "".join(result)
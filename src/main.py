@@ -1,18 +1,46 @@
 import argparse
+import concurrent.futures
+import json
+import os
 import logging
 import re
 import sys
+import time
 
 import mmh3
 import REMSGUtil
-from typing import List
+from typing import Final, List, NamedTuple
 from pathlib import Path
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MODES: Final[tuple[str, ...]] = ("csv", "txt", "json", "dump")
+"""output formats, see --mode"""
+BATCH_BYTES: Final[int] = 1 << 20
+"""files smaller than this are packed into one task, up to this many bytes in total"""
+BATCH_FILES: Final[int] = 64
+"""max number of files in one task"""
+IN_FLIGHT_PER_PROCESS: Final[int] = 2
+"""tasks submitted but not done yet, per process"""
 
-errorFileList = {}
+
+def getConverterVersion() -> str:
+    """hash of the converter code itself, so any change of it invalidates all conversion cache.
+    hashed once by main(), workers get it as the converterVersion option"""
+    return REMSGUtil.hashCode((__name__, "REMSGUtil", "REMSG", "REWString", "HexTool"))
+
+
+class FileResult(NamedTuple):
+    """result of converting one file, sent back to the main process"""
+
+    file: Path
+    status: str
+    """ok / cached / error"""
+    seconds: float
+    error: str | None = None
+    record: dict | None = None
+    """conversion cache record of this file, if cache is used"""
 
 
 isValidMsgNameRegex = re.compile(r"\.msg.*(?<!\.txt)(?<!\.json)(?<!\.csv)$", re.IGNORECASE)
@@ -42,40 +70,231 @@ def fillList(inpath: str | Path, filetype: str = "msg") -> List[Path]:
     return []
 
 
-def worker(item: Path, mode: str = "csv", modFile: Path | None = None, lang: int = REMSGUtil.SHORT_LANG_LU["ja"], **kwargs) -> None:
+def worker(item: Path, mode: str = "csv", modFile: Path | None = None, lang: int = REMSGUtil.SHORT_LANG_LU["ja"], **kwargs) -> FileResult:
+    start = time.perf_counter()
     try:
         filenameFull = str(item.resolve())
         modFile = str(modFile.resolve()) if modFile is not None else None
         print("processing:" + filenameFull)
 
-        msg = REMSGUtil.importMSG(filenameFull)
-
-        if mode == "csv":
-            if modFile is None:
-                REMSGUtil.exportCSV(msg, filenameFull + "." + mode)
-            else:
-                REMSGUtil.exportMSG(msg=REMSGUtil.importCSV(msg, modFile), filename=filenameFull + ".new")
-
-        elif mode == "txt":
-            if modFile is None:
-                REMSGUtil.exportTXT(msg, filenameFull + "." + mode, lang, encode=kwargs["txtformat"], withEntryName=kwargs["entryName"])
-            else:
-                REMSGUtil.exportMSG(msg=REMSGUtil.importTXT(msg, modFile, lang, encode=kwargs["txtformat"]), filename=filenameFull + ".new")
-
-        elif mode == "json":
-            if modFile is None:
-                REMSGUtil.exportJson(msg, filenameFull + "." + mode)
-            else:
-                REMSGUtil.exportMSG(msg=REMSGUtil.importJson(msg, modFile), filename=filenameFull + ".new")
-
-        elif mode == "dump":
-            REMSGUtil.exportMHRTextDump(msg, filenameFull + ".txt")
+        modes = mode.split(",")
+        # txt / dump export only read a few languages
+        keepPool = modFile is not None and kwargs.get("pool") == "source"
+        msg = REMSGUtil.importMSG(filenameFull, lazy=(modFile is None and all(outMode in ("txt", "dump") for outMode in modes)), validation=kwargs.get("validation", REMSGUtil.REMSG.VALIDATION_FULL), keepSourcePool=keepPool, cacheDir=kwargs.get("parseCache"), cacheVersion=kwargs.get("parseCacheVersion"))
+
+        diReport = None
+        if modFile is None:
+            # scan once for all the outputs, for everything any of them would check
+            fullScan = "csv" in modes or "json" in modes
+            scanLangs = list()
+            if "txt" in modes:
+                scanLangs.append(lang)
+            if "dump" in modes:
+                scanLangs.extend(REMSGUtil.REMSG.MHR_SUPPORTED_LANG)
+            diReport = REMSGUtil.printDIWarning(
+                msg,
+                langIndex=None if fullScan else list(dict.fromkeys(scanLangs)),
+                detectAttrHead=fullScan,
+                detectEntryName=fullScan or ("txt" in modes and kwargs["entryName"]),
+                detectAttr=fullScan,
+            )
+        else:
+            assert len(modes) == 1, "only one mode can be used with edit file"
+
+        for outMode in modes:
+            if outMode == "csv":
+                if modFile is None:
+                    REMSGUtil.exportCSV(msg, filenameFull + "." + outMode, diReport)
+                else:
+                    REMSGUtil.exportMSG(msg=REMSGUtil.importCSV(msg, modFile), filename=filenameFull + ".new", incremental=keepPool)
+
+            elif outMode == "txt":
+                if modFile is None:
+                    REMSGUtil.exportTXT(msg, filenameFull + "." + outMode, lang, encode=kwargs["txtformat"], withEntryName=kwargs["entryName"], diReport=diReport)
+                else:
+                    REMSGUtil.exportMSG(msg=REMSGUtil.importTXT(msg, modFile, lang, encode=kwargs["txtformat"]), filename=filenameFull + ".new", incremental=keepPool)
+
+            elif outMode == "json":
+                if modFile is None:
+                    REMSGUtil.exportJson(msg, filenameFull + "." + outMode, diReport)
+                else:
+                    REMSGUtil.exportMSG(msg=REMSGUtil.importJson(msg, modFile), filename=filenameFull + ".new", incremental=keepPool)
+
+            elif outMode == "dump":
+                REMSGUtil.exportMHRTextDump(msg, filenameFull + ".txt", diReport=diReport)
 
     except Exception as e:
         print(f"error with file {item}")
         # print(traceback.format_exc())
         logger.exception(e)
-        errorFileList[item] = str(e)
+        return FileResult(item, "error", time.perf_counter() - start, str(e))
+
+    return FileResult(item, "ok", time.perf_counter() - start)
+
+
+def getOutputFiles(item: Path, mode: str, modFile: Path | None) -> List[str]:
+    """files written by worker for the input"""
+    filenameFull = str(item.resolve())
+    if modFile is not None:
+        return [filenameFull + ".new"]
+    outputs = []
+    for outMode in mode.split(","):
+        if outMode == "dump":
+            outputs.extend(REMSGUtil.getMHRTextDumpFiles(filenameFull + ".txt").values())
+        else:
+            outputs.append(filenameFull + "." + outMode)
+    return outputs
+
+
+def statFiles(files: List[str]) -> dict[str, List[int] | None]:
+    """{file : [size, mtime_ns]}, None if the file does not exist"""
+    stats = {}
+    for file in files:
+        try:
+            stat = os.stat(file)
+            stats[file] = [stat.st_size, stat.st_mtime_ns]
+        except FileNotFoundError:
+            stats[file] = None
+    return stats
+
+
+def getCacheKey(item: Path, modFile: Path | None, **kwargs) -> str:
+    """hash of input content, edit content, converter version (the converterVersion option) and all the flags"""
+    hasher = mmh3.mmh3_x64_128(seed=0)
+    # where the parsed msg is cached does not change the outputs
+    options = {key: value for key, value in kwargs.items() if key not in ("parseCache", "parseCacheVersion")}
+    hasher.update(json.dumps(options, sort_keys=True).encode("utf-8"))
+    for file in (item, modFile):
+        if file is not None:
+            with REMSGUtil.mapFile(str(file)) as buffer:
+                hasher.update(buffer)
+    return hasher.digest().hex()
+
+
+def cachedWorker(item: Path, modFile: Path | None, record: dict | None, **kwargs) -> FileResult:
+    """worker, but skip the file if its cache key and outputs are the same as the record of last run"""
+    start = time.perf_counter()
+    try:
+        key = getCacheKey(item, modFile, **kwargs)
+        outputs = getOutputFiles(item, kwargs.get("mode", "csv"), modFile)
+    except Exception as e:
+        logger.exception(e)
+        return FileResult(item, "error", time.perf_counter() - start, str(e))
+
+    if record is not None and record["key"] == key and record["outputs"] == statFiles(outputs):
+        print("cached:" + str(item))
+        return FileResult(item, "cached", time.perf_counter() - start, record=record)
+
+    result = worker(item, modFile=modFile, **kwargs)
+    if result.status != "ok":
+        return result
+    return result._replace(seconds=time.perf_counter() - start, record={"key": key, "outputs": statFiles(outputs)})
+
+
+def batchWorker(batch: List[tuple[Path, Path | None]], records: dict[str, dict] | None = None, **kwargs) -> List[FileResult]:
+    """convert (file, edit) pairs of a batch in one task
+
+    @param records: conversion cache records of last run, by input file. None to not use cache.
+    """
+    if records is None:
+        return list([worker(file, modFile=edit, **kwargs) for file, edit in batch])
+    return list([cachedWorker(file, edit, records.get(str(file)), **kwargs) for file, edit in batch])
+
+
+def loadCache(filename: str) -> dict[str, dict]:
+    """read conversion cache manifest, {input file : {"key": cache key, "outputs": statFiles of outputs}}"""
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        print(f"ignore broken cache manifest {filename}: {e}")
+        return {}
+    return manifest if isinstance(manifest, dict) else {}
+
+
+def saveCache(filename: str, manifest: dict[str, dict], results: List[FileResult]) -> None:
+    """update records of this run into the manifest and write it"""
+    for result in results:
+        if result.record is not None:
+            manifest[str(result.file)] = result.record
+        else:
+            manifest.pop(str(result.file), None)
+    with open(filename + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(filename + ".tmp", filename)
+
+
+def makeBatches(filenameList: List[Path], editList: List[Path | None]) -> List[List[tuple[Path, Path | None]]]:
+    """pair files with their edit file, largest first, small files are packed into batches"""
+
+    def pairSize(pair: tuple[Path, Path | None]) -> int:
+        return sum(file.stat().st_size for file in pair if file is not None and file.is_file())
+
+    batches = []
+    batch = []
+    batchSize = 0
+    for pair in sorted(zip(filenameList, editList), key=pairSize, reverse=True):
+        size = pairSize(pair)
+        if size >= BATCH_BYTES:
+            batches.append([pair])
+            continue
+        batch.append(pair)
+        batchSize += size
+        if batchSize >= BATCH_BYTES or len(batch) >= BATCH_FILES:
+            batches.append(batch)
+            batch = []
+            batchSize = 0
+    if len(batch) > 0:
+        batches.append(batch)
+    return batches
+
+
+def runBatches(executor: concurrent.futures.Executor, batches: List[List[tuple[Path, Path | None]]], maxInFlight: int, manifest: dict[str, dict] | None = None, **kwargs) -> List[FileResult]:
+    """submit batches in order, with at most maxInFlight of them not done, return results of all files
+
+    @param manifest: conversion cache manifest, see loadCache. None to not use cache.
+    """
+
+    results = []
+    inFlight = {}
+
+    def collect(done):
+        for future in done:
+            batch = inFlight.pop(future)
+            try:
+                results.extend(future.result())
+            except Exception as e:  # the process died, e.g. out of memory
+                logger.exception(e)
+                results.extend([FileResult(file, "error", 0.0, str(e)) for file, _ in batch])
+
+    for batchIndex, batch in enumerate(batches):
+        if len(inFlight) >= maxInFlight:
+            done, _ = concurrent.futures.wait(inFlight, return_when=concurrent.futures.FIRST_COMPLETED)
+            collect(done)
+        records = None if manifest is None else {str(file): manifest[str(file)] for file, _ in batch if str(file) in manifest}
+        try:
+            inFlight[executor.submit(batchWorker, batch, records, **kwargs)] = batch
+        except concurrent.futures.BrokenExecutor as e:
+            # a process died and the pool cannot take more tasks, files not submitted yet are reported as errors
+            logger.error(f"{e}, {sum(len(pending) for pending in batches[batchIndex:])} files are not converted")
+            for pending in batches[batchIndex:]:
+                results.extend([FileResult(file, "error", 0.0, str(e)) for file, _ in pending])
+            break
+    done, _ = concurrent.futures.wait(inFlight)
+    collect(done)
+    return results
+
+
+def parseModes(text: str) -> str:
+    """argparse type of --mode, comma separated modes without duplicates"""
+    modes = list([mode.strip().lower() for mode in text.split(",")])
+    for mode in modes:
+        if mode not in MODES:
+            raise argparse.ArgumentTypeError(f"invalid mode {mode!r} (choose from {', '.join(MODES)})")
+    return ",".join(dict.fromkeys(modes))
+
 
 def getFolders(parser: argparse.ArgumentParser) -> tuple[List[Path], List[Path | None]]:
     args = parser.parse_args()
@@ -84,6 +303,9 @@ def getFolders(parser: argparse.ArgumentParser) -> tuple[List[Path], List[Path |
     editList = []
 
     editMode = args.edit is not None
+    # a dump is not read back, there is no .dump edit file
+    if "dump" in args.mode.split(",") and (editMode or len(args.args) == 2):
+        parser.error("dump mode cannot be used with edit file/folder input, use csv / txt / json to edit.")
 
     if args.input is not None:
         filenameList = fillList(args.input)
@@ -160,8 +382,8 @@ def main():
                         help="input msg file or folder")
     parser.add_argument("-x", "--multiprocess", type=int, default=4,
                         help="when you are processing multiple files. How many processes to use to convert the files")
-    parser.add_argument("-m", "--mode", type=str, choices=["csv", "txt", "json"], default="csv",
-                        help="choose output file format.\n  txt = msg tool style txt.\n  csv = all lang in one csv with rich info.\n  json = all lang in one json with rich info in mhrice format")
+    parser.add_argument("-m", "--mode", type=parseModes, default="csv",
+                        help="choose output file format, or several formats separated by comma (e.g. csv,json).\n  txt = msg tool style txt.\n  csv = all lang in one csv with rich info.\n  json = all lang in one json with rich info in mhrice format.\n  dump = txt of each lang in its own folder.\n  several formats are exported from one read of each msg file, and cannot be used with edit")
     parser.add_argument("-e", "--edit", type=str,
                         help="input (csv/txt/json) file to edit the content.\n  if input as folder, the filename and number of files\n  should be same as original .msg file\n  (with corresponding (.txt/.csv/.json) extension)")
     parser.add_argument("-l", "--lang", type=str, default="ja", choices=REMSGUtil.SHORT_LANG_LU.keys(),
@@ -170,29 +392,66 @@ def main():
                         help="force txt read/write format to be 'utf-8' or 'utf-8-sig'(BOM).\n")
     parser.add_argument("-n", "--entryName", action='store_true', default=False,
                         help="Also export the entry name to txt file.\n")
+    parser.add_argument("--validation", type=str, default=REMSGUtil.REMSG.VALIDATION_FULL, choices=REMSGUtil.REMSG.VALIDATION_LEVELS,
+                        help="how much of the msg file get checked when reading (default full).\n  none = trust the file, skip all checks.\n  structural = check section offsets and paddings only.\n  full = also check the hash / index of each entry")
+    parser.add_argument("-p", "--pool", type=str, default="sorted", choices=["sorted", "source"],
+                        help="string pool layout of the new msg file when editing (default sorted).\n  sorted = rebuild a sorted string pool.\n  source = keep the string pool of the original msg file and append new strings,\n  unmodified files are written back byte identical")
+    parser.add_argument("-c", "--cache", type=str, default=None,
+                        help="conversion cache manifest file (e.g. remsg_cache.json).\n  files with the same content and options as the last run\n  are skipped if their outputs are not changed")
+    parser.add_argument("--parseCache", type=str, default=None,
+                        help="folder to keep parsed msg files in, they are loaded from it\n  instead of parsing again until the msg file changes")
+    parser.add_argument("--parseCacheSize", type=int, default=1024,
+                        help="size limit of the parse cache folder in MiB (default 1024),\n  least recently used files are removed after each run")
+    parser.add_argument("--evictParseCache", action='store_true', default=False,
+                        help="only remove files over --parseCacheSize from the --parseCache folder, then exit.\n  use --parseCacheSize 0 to clear it")
     parser.add_argument("args", nargs=argparse.REMAINDER)
     args = parser.parse_args()
 
     # print('\n'.join([REMSGUtil.LANG_LIST.get(v,f"lang_{v}")+": "+k for k, v in REMSGUtil.SHORT_LANG_LU.items()]))
 
-    errorFileList = {}
+    if args.edit is not None and "," in args.mode:
+        print("only one mode can be used with edit file/folder input.")
+        sys.exit(1)
+
+    if args.evictParseCache:
+        if args.parseCache is None:
+            print("--evictParseCache needs the --parseCache folder.")
+            sys.exit(1)
+        removed, kept = REMSGUtil.evictParseCache(args.parseCache, args.parseCacheSize * 1024 * 1024)
+        print(f"removed {removed} files from parse cache, {kept / 1024 / 1024:.1f} MiB kept.")
+        sys.exit()
+
     filenameList, editList = getFolders(parser)
 
-    executor = concurrent.futures.ProcessPoolExecutor(args.multiprocess)
-    futures = [executor.submit(worker, file, mode=args.mode, modFile=edit, lang=REMSGUtil.SHORT_LANG_LU[args.lang], txtformat=args.txtformat, entryName=args.entryName) for file, edit in zip(filenameList, editList)]
-    concurrent.futures.wait(futures)
+    manifest = loadCache(args.cache) if args.cache is not None else None
+
+    start = time.perf_counter()
+    # code hashes are taken once here and passed down, instead of every worker process hashing the sources (or the whole executable)
+    converterVersion = getConverterVersion() if manifest is not None else None
+    parseCacheVersion = REMSGUtil.getParseCacheVersion() if args.parseCache is not None else None
+    with concurrent.futures.ProcessPoolExecutor(args.multiprocess) as executor:
+        results = runBatches(executor, makeBatches(filenameList, editList), args.multiprocess * IN_FLIGHT_PER_PROCESS, manifest,
+                             mode=args.mode, lang=REMSGUtil.SHORT_LANG_LU[args.lang], txtformat=args.txtformat, entryName=args.entryName, validation=args.validation, pool=args.pool,
+                             parseCache=args.parseCache, parseCacheVersion=parseCacheVersion, converterVersion=converterVersion)
+
+    if args.parseCache is not None:
+        REMSGUtil.evictParseCache(args.parseCache, args.parseCacheSize * 1024 * 1024)
+    if manifest is not None:
+        saveCache(args.cache, manifest, results)
 
-    if len(errorFileList) > 0:
+    errors = list([result for result in results if result.status == "error"])
+    if len(errors) > 0:
         print("Failed file summary:")
-        for file, error in errorFileList.items():
-            print(f"{file}: {error}")
+        for result in errors:
+            print(f"{result.file}: {result.error}")
 
+    slowest = max(results, key=lambda result: result.seconds)
+    print(f"{len(results) - len(errors)}/{len(results)} files converted ({sum(1 for result in results if result.status == "cached")} cached) in {time.perf_counter() - start:.2f}s, slowest: {slowest.file} ({slowest.seconds:.2f}s)")
     print("All Done.")
 
 
 if __name__ == "__main__":
     # import threading
-    import concurrent.futures
     import multiprocessing
 
     multiprocessing.freeze_support()